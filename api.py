@@ -0,0 +1,147 @@
+import argparse
+import hashlib
+
+import tornado.ioloop
+import tornado.web
+
+from data_access import (create_tables, get_comments, get_feed_page, get_post_by_id,
+                         get_post_stats)
+
+DEFAULT_PORT = 8502
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+# SQLite integers are signed 64-bit; larger values can't be bound as parameters
+MAX_SQLITE_INT = 2 ** 63 - 1
+
+# Read-only JSON API over the same data functions the Streamlit app uses.
+#
+#   GET /api/posts?before=<id>&limit=<n>          feed, newest first
+#   GET /api/posts/<id>                            one post with counters
+#   GET /api/posts/<id>/comments?after=<path>&limit=<n>
+#   GET /api/posts/<id>/likes
+#
+# Every response carries an ETag built from post versions and like/comment
+# counters rather than from the body, so a client polling with
+# If-None-Match gets a 304 before anything is serialized.
+
+def make_etag(*parts):
+    return '"' + hashlib.sha1(repr(parts).encode()).hexdigest()[:20] + '"'
+
+def post_json(post, stats):
+    data = post._asdict()
+    data["archived"] = bool(post.archived)
+    data["version"] = stats.version if stats else 1
+    data["like_count"] = stats.like_count if stats else 0
+    data["comment_count"] = stats.comment_count if stats else 0
+    return data
+
+class BaseHandler(tornado.web.RequestHandler):
+    def set_default_headers(self):
+        self.set_header("Content-Type", "application/json; charset=UTF-8")
+        # Let clients and proxies keep responses but always revalidate
+        self.set_header("Cache-Control", "no-cache")
+
+    def write_error(self, status_code, **kwargs):
+        self.finish({"error": self._reason})
+
+    # Tornado would otherwise hash the serialized body; our ETags are set
+    # up front from versions and counters instead
+    def compute_etag(self):
+        return None
+
+    def get_limit(self):
+        try:
+            limit = int(self.get_query_argument("limit", DEFAULT_PAGE_SIZE))
+        except ValueError:
+            raise tornado.web.HTTPError(400, reason="limit must be an integer")
+        return max(1, min(limit, MAX_PAGE_SIZE))
+
+    def get_post_or_404(self, post_id):
+        post_id = int(post_id)
+        # No row can have an id SQLite can't store
+        if post_id > MAX_SQLITE_INT:
+            raise tornado.web.HTTPError(404, reason="post not found")
+        post = get_post_by_id(post_id)
+        if post is None:
+            raise tornado.web.HTTPError(404, reason="post not found")
+        return post
+
+    # Send 304 if the client already has this version, otherwise build and
+    # write the body
+    def respond(self, etag, build):
+        self.set_header("Etag", etag)
+        if self.check_etag_header():
+            self.set_status(304)
+            return
+        self.write(build())
+
+class FeedHandler(BaseHandler):
+    def get(self):
+        limit = self.get_limit()
+        before = self.get_query_argument("before", None)
+        try:
+            before = int(before) if before is not None else None
+        except ValueError:
+            raise tornado.web.HTTPError(400, reason="before must be a post id")
+        if before is not None and not -MAX_SQLITE_INT - 1 <= before <= MAX_SQLITE_INT:
+            raise tornado.web.HTTPError(400, reason="before is out of range")
+
+        posts = get_feed_page(before, limit)
+        stats = get_post_stats([post.id for post in posts])
+        next_before = posts[-1].id if len(posts) == limit else None
+        etag = make_etag("feed", before, limit,
+                         [(post.id,) + tuple(stats.get(post.id, ())[1:]) for post in posts])
+        self.respond(etag, lambda: {
+            "posts": [post_json(post, stats.get(post.id)) for post in posts],
+            "next_before": next_before,
+        })
+
+class PostHandler(BaseHandler):
+    def get(self, post_id):
+        post = self.get_post_or_404(post_id)
+        stats = get_post_stats([post.id], archived=post.archived).get(post.id)
+        self.respond(make_etag("post", post.id, post.archived, stats),
+                     lambda: post_json(post, stats))
+
+class CommentsHandler(BaseHandler):
+    def get(self, post_id):
+        post = self.get_post_or_404(post_id)
+        limit = self.get_limit()
+        after = self.get_query_argument("after", None)
+        comments = get_comments(post.id, after_path=after, limit=limit, archived=post.archived)
+        next_after = comments[-1].path if len(comments) == limit else None
+        # Comments are never edited, so their ids (plus whether each has replies
+        # yet) identify the page contents
+        etag = make_etag("comments", post.id, after, limit,
+                         [(comment.id, comment.has_replies) for comment in comments])
+        self.respond(etag, lambda: {
+            "comments": [{**comment._asdict(), "has_replies": bool(comment.has_replies)}
+                         for comment in comments],
+            "next_after": next_after,
+        })
+
+class LikesHandler(BaseHandler):
+    def get(self, post_id):
+        post = self.get_post_or_404(post_id)
+        stats = get_post_stats([post.id], archived=post.archived).get(post.id)
+        like_count = stats.like_count if stats else 0
+        self.respond(make_etag("likes", post.id, like_count),
+                     lambda: {"post_id": post.id, "like_count": like_count})
+
+def make_app():
+    return tornado.web.Application([
+        (r"/api/posts", FeedHandler),
+        (r"/api/posts/(\d+)", PostHandler),
+        (r"/api/posts/(\d+)/comments", CommentsHandler),
+        (r"/api/posts/(\d+)/likes", LikesHandler),
+    ])
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the read-only blog JSON API")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT,
+                        help=f"port to listen on (default {DEFAULT_PORT}; Streamlit uses 8501)")
+    args = parser.parse_args()
+    create_tables()
+    make_app().listen(args.port)
+    print(f"Blog API listening on http://localhost:{args.port}/api/posts")
+    tornado.ioloop.IOLoop.current().start()
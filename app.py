@@ -2,56 +2,25 @@ import streamlit as st
 import sqlite3
 import hashlib
 import os
+import math
 from datetime import datetime
 from streamlit_option_menu import option_menu
+from data_access import (create_tables, login_user, get_user, get_post_by_id,
+                         get_post_titles, comment_path_segment)
+import static_site
+import related_posts
+import view_counter
+import post_history
+import rate_limit
+import feed_loader
 
 # Initialize database and directories
 os.makedirs("database", exist_ok=True)
 
-# Database functions
-def create_tables():
-    conn = sqlite3.connect('database/blog.db')
-    c = conn.cursor()
-    
-    # Users table
-    c.execute('''CREATE TABLE IF NOT EXISTS users
-                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                 username TEXT UNIQUE NOT NULL,
-                 password TEXT NOT NULL,
-                 bio TEXT,
-                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''')
-    
-    # Posts table - simplified without image_path
-    c.execute('''CREATE TABLE IF NOT EXISTS posts
-                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                 author TEXT NOT NULL,
-                 title TEXT NOT NULL,
-                 content TEXT NOT NULL,
-                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''')
-    
-    # Comments table
-    c.execute('''CREATE TABLE IF NOT EXISTS comments
-                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                 post_id INTEGER NOT NULL,
-                 user_id INTEGER NOT NULL,
-                 content TEXT NOT NULL,
-                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                 FOREIGN KEY(post_id) REFERENCES posts(id),
-                 FOREIGN KEY(user_id) REFERENCES users(id))''')
-    
-    # Likes table
-    c.execute('''CREATE TABLE IF NOT EXISTS likes
-                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                 post_id INTEGER NOT NULL,
-                 user_id INTEGER NOT NULL,
-                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                 FOREIGN KEY(post_id) REFERENCES posts(id),
-                 FOREIGN KEY(user_id) REFERENCES users(id),
-                 UNIQUE(post_id, user_id))''')
-    
-    conn.commit()
-    conn.close()
+COMMENT_MAX_DEPTH = 3
+COMMENTS_PAGE_SIZE = 20
 
+# Database functions
 def register_user(username, password):
     try:
         hashed_password = hashlib.sha256(password.encode()).hexdigest()
@@ -65,24 +34,6 @@ def register_user(username, password):
     except sqlite3.IntegrityError:
         return False
 
-def login_user(username, password):
-    hashed_password = hashlib.sha256(password.encode()).hexdigest()
-    conn = sqlite3.connect('database/blog.db')
-    c = conn.cursor()
-    c.execute("SELECT * FROM users WHERE username = ? AND password = ?", 
-             (username, hashed_password))
-    user = c.fetchone()
-    conn.close()
-    return user
-
-def get_user(username):
-    conn = sqlite3.connect('database/blog.db')
-    c = conn.cursor()
-    c.execute("SELECT * FROM users WHERE username = ?", (username,))
-    user = c.fetchone()
-    conn.close()
-    return user
-
 def update_profile(username, bio):
     try:
         conn = sqlite3.connect('database/blog.db')
@@ -95,6 +46,15 @@ def update_profile(username, bio):
     except:
         return False
 
+# Keep data derived from posts (the static HTML snapshot, the related-posts
+# index) in step with the database. A failed refresh never fails the write
+# that triggered it.
+def refresh_derived_data(label, hook, post_id):
+    try:
+        hook(post_id)
+    except Exception as e:
+        st.warning(f"Saved, but {label} could not be updated: {e}")
+
 def add_post(author, title, content, categories=None, tags=None):
     try:
         conn = sqlite3.connect('database/blog.db')
@@ -106,53 +66,31 @@ def add_post(author, title, content, categories=None, tags=None):
         post_id = c.lastrowid
         conn.commit()
         conn.close()
+        refresh_derived_data("the public site", static_site.post_added, post_id)
+        refresh_derived_data("related posts", related_posts.post_changed, post_id)
         return post_id
     except Exception as e:
         st.error(f"Error adding post: {e}")
         return False
 
-def get_all_posts(search_term=None, author=None):
-    conn = sqlite3.connect('database/blog.db')
-    c = conn.cursor()
-    
-    query = "SELECT * FROM posts"
-    params = []
-    
-    if search_term or author:
-        query += " WHERE"
-        if search_term:
-            query += " (title LIKE ? OR content LIKE ?)"
-            params.extend([f"%{search_term}%", f"%{search_term}%"])
-        if author:
-            if search_term:
-                query += " AND"
-            query += " author = ?"
-            params.append(author)
-    
-    query += " ORDER BY id DESC"
-    c.execute(query, params)
-    posts = c.fetchall()
-    conn.close()
-    return posts
-
-def get_post_by_id(post_id):
-    conn = sqlite3.connect('database/blog.db')
-    c = conn.cursor()
-    c.execute("SELECT * FROM posts WHERE id = ?", (post_id,))
-    post = c.fetchone()
-    conn.close()
-    return post
-
 def update_post(post_id, title, content, categories=None, tags=None):
     try:
         conn = sqlite3.connect('database/blog.db')
         c = conn.cursor()
+        # Keep the version being replaced in the revision history, in the
+        # same transaction as the update
+        c.execute("SELECT title, content FROM posts WHERE id = ?", (post_id,))
+        current = c.fetchone()
+        if current and current != (title, content):
+            post_history.record_revision(c, post_id, current[0], current[1], title, content)
         c.execute("""UPDATE posts SET 
-                    title = ?, content = ? 
+                    title = ?, content = ?, version = version + 1 
                     WHERE id = ?""",
                  (title, content, post_id))
         conn.commit()
         conn.close()
+        refresh_derived_data("the public site", static_site.post_updated, post_id)
+        refresh_derived_data("related posts", related_posts.post_changed, post_id)
         return True
     except Exception as e:
         st.error(f"Error updating post: {e}")
@@ -164,40 +102,46 @@ def delete_post(post_id):
         c = conn.cursor()
         # First delete comments associated with the post
         c.execute("DELETE FROM comments WHERE post_id = ?", (post_id,))
+        c.execute("DELETE FROM post_revisions WHERE post_id = ?", (post_id,))
         # Then delete the post
         c.execute("DELETE FROM posts WHERE id = ?", (post_id,))
         conn.commit()
         conn.close()
+        refresh_derived_data("the public site", static_site.post_deleted, post_id)
+        refresh_derived_data("related posts", related_posts.post_removed, post_id)
         return True
     except Exception as e:
         st.error(f"Error deleting post: {e}")
         return False
 
-def add_comment(post_id, user_id, content):
+def add_comment(post_id, user_id, content, parent_id=None):
     try:
         conn = sqlite3.connect('database/blog.db')
         c = conn.cursor()
-        c.execute("INSERT INTO comments (post_id, user_id, content) VALUES (?, ?, ?)",
-                 (post_id, user_id, content))
+        parent_path, depth = None, 0
+        if parent_id is not None:
+            c.execute("SELECT path, depth FROM comments WHERE id = ? AND post_id = ?",
+                     (parent_id, post_id))
+            parent = c.fetchone()
+            if parent is None:
+                conn.close()
+                st.error("Error adding comment: the comment you replied to no longer exists")
+                return False
+            parent_path, depth = parent[0], parent[1] + 1
+        c.execute("INSERT INTO comments (post_id, user_id, content, parent_id, depth) VALUES (?, ?, ?, ?, ?)",
+                 (post_id, user_id, content, parent_id, depth))
+        comment_id = c.lastrowid
+        segment = comment_path_segment(comment_id)
+        path = f"{parent_path}/{segment}" if parent_path else segment
+        c.execute("UPDATE comments SET path = ? WHERE id = ?", (path, comment_id))
         conn.commit()
         conn.close()
+        refresh_derived_data("the public site", static_site.comment_added, post_id)
         return True
     except Exception as e:
         st.error(f"Error adding comment: {e}")
         return False
 
-def get_comments(post_id):
-    conn = sqlite3.connect('database/blog.db')
-    c = conn.cursor()
-    c.execute("""SELECT comments.*, users.username 
-              FROM comments 
-              JOIN users ON comments.user_id = users.id 
-              WHERE post_id = ? 
-              ORDER BY created_at DESC""", (post_id,))
-    comments = c.fetchall()
-    conn.close()
-    return comments
-
 def add_like(post_id, user_id):
     try:
         conn = sqlite3.connect('database/blog.db')
@@ -222,23 +166,6 @@ def remove_like(post_id, user_id):
     except:
         return False
 
-def get_likes_count(post_id):
-    conn = sqlite3.connect('database/blog.db')
-    c = conn.cursor()
-    c.execute("SELECT COUNT(*) FROM likes WHERE post_id = ?", (post_id,))
-    count = c.fetchone()[0]
-    conn.close()
-    return count
-
-def has_user_liked(post_id, user_id):
-    conn = sqlite3.connect('database/blog.db')
-    c = conn.cursor()
-    c.execute("SELECT 1 FROM likes WHERE post_id = ? AND user_id = ?", 
-             (post_id, user_id))
-    result = c.fetchone() is not None
-    conn.close()
-    return result
-
 # Initialize database tables
 create_tables()
 
@@ -423,6 +350,8 @@ if 'user_id' not in st.session_state:
     st.session_state.user_id = None
 if 'dark_mode' not in st.session_state:
     st.session_state.dark_mode = False
+if 'viewed_posts' not in st.session_state:
+    st.session_state.viewed_posts = set()
 
 # User authentication
 if not st.session_state.logged_in:
@@ -446,7 +375,7 @@ if not st.session_state.logged_in:
             if user:
                 st.session_state.logged_in = True
                 st.session_state.username = username
-                st.session_state.user_id = user[0]
+                st.session_state.user_id = user.id
                 st.sidebar.success("Logged in successfully!")
                 st.success("Logged in successfully!")
                 st.rerun()
@@ -483,6 +412,144 @@ if not st.session_state.logged_in:
     )
 
 
+# Per-user write throttling; shows the reason when a click is rejected
+def within_rate_limit(action):
+    allowed, retry_after = rate_limit.allow(st.session_state.user_id, action)
+    if not allowed:
+        st.warning(f"⏳ You're doing that too often. Please wait {math.ceil(retry_after)}s and try again.")
+    return allowed
+
+# Title-only, paginated picker over the current user's posts for the Edit
+# and Delete pages. Returns the selected post id; the full post is loaded
+# by the caller for that one row only.
+POST_PICKER_PAGE_SIZE = 20
+
+def render_post_picker(label, key, empty_message):
+    search = st.text_input("🔍 Filter by title", key=f"{key}_search").strip()
+    cursors_key = f"{key}_cursors"
+    # One keyset cursor per visited page; a new filter starts over
+    if st.session_state.get(f"{key}_filter") != search or cursors_key not in st.session_state:
+        st.session_state[f"{key}_filter"] = search
+        st.session_state[cursors_key] = [None]
+    cursors = st.session_state[cursors_key]
+    
+    rows = get_post_titles(st.session_state.username, search_term=search or None,
+                           before_id=cursors[-1], limit=POST_PICKER_PAGE_SIZE + 1)
+    has_older = len(rows) > POST_PICKER_PAGE_SIZE
+    rows = rows[:POST_PICKER_PAGE_SIZE]
+    if not rows:
+        st.info("No posts match that filter." if search else empty_message)
+        return None
+    
+    titles = {row.id: f"{row.id} - {row.title}" for row in rows}
+    post_id = st.radio(label, list(titles), format_func=titles.get, key=f"{key}_select")
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        if len(cursors) > 1 and st.button("⬅ Newer", key=f"{key}_newer"):
+            cursors.pop()
+            st.rerun()
+    with col2:
+        if has_older and st.button("Older ➡", key=f"{key}_older"):
+            cursors.append(rows[-1].id)
+            st.rerun()
+    return post_id
+
+# Post views, counted once per session and post
+def track_view(post_id, views):
+    if post_id not in st.session_state.viewed_posts:
+        st.session_state.viewed_posts.add(post_id)
+        # Not counted if the view buffer is full
+        if view_counter.record_view(post_id):
+            views += 1
+    return views
+
+# Related posts
+def render_related_posts(related):
+    if related:
+        st.markdown("**📚 Related posts**")
+        for post in related:
+            # Link to the post's public page when the site is published
+            url = static_site.post_url(post.id)
+            title = f"[{post.title}]({url})" if url else post.title
+            st.markdown(f"- {title} <span style=\"color: #666;\">by {post.author}</span>",
+                        unsafe_allow_html=True)
+
+# Comment threads
+# A thread view is a root (None for the whole post, or a comment opened with
+# "Continue this thread") plus a stack of keyset cursors, one per page
+def comment_state(post_id):
+    key = f"comment_view_{post_id}"
+    if key not in st.session_state:
+        st.session_state[key] = {"root_id": None, "root_depth": 0, "cursors": [None]}
+    return st.session_state[key]
+
+# The get_comments arguments for a post's thread as this reader has it
+# expanded; the feed loader fetches every thread up front with these
+def comment_window(post_id):
+    view = comment_state(post_id)
+    # One extra row tells whether another page exists
+    return {"root_id": view["root_id"], "max_depth": COMMENT_MAX_DEPTH,
+            "after_path": view["cursors"][-1], "limit": COMMENTS_PAGE_SIZE + 1}
+
+def render_comment_thread(post_id, comments, archived=False):
+    view = comment_state(post_id)
+    has_more = len(comments) > COMMENTS_PAGE_SIZE
+    comments = comments[:COMMENTS_PAGE_SIZE]
+    
+    if view["root_id"] is not None:
+        if st.button("⬅ Back to all comments", key=f"comment_back_{post_id}"):
+            view.update(root_id=None, root_depth=0, cursors=[None])
+            st.rerun()
+    
+    for comment in comments:
+        indent = (comment.depth - view["root_depth"]) * 24
+        st.markdown(f"""
+        <div style="background-color: var(--light); padding: 10px; border-radius: 8px; margin: 5px 0 5px {indent}px;">
+            <strong>{comment.username}:</strong> {comment.content}
+            <div style="font-size: 0.8em; color: #666;">{comment.created_at}</div>
+        </div>
+        """, unsafe_allow_html=True)
+        # Replies below the depth limit open as their own thread
+        if comment.depth - view["root_depth"] == COMMENT_MAX_DEPTH and comment.has_replies:
+            if st.button("Continue this thread ↪", key=f"comment_expand_{comment.id}"):
+                view.update(root_id=comment.id, root_depth=comment.depth, cursors=[None])
+                st.rerun()
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        if len(view["cursors"]) > 1 and st.button("⬅ Newer comments", key=f"comment_newer_{post_id}"):
+            view["cursors"].pop()
+            st.rerun()
+    with col2:
+        if has_more and st.button("Older comments ➡", key=f"comment_older_{post_id}"):
+            view["cursors"].append(comments[-1].path)
+            st.rerun()
+    
+    if archived:
+        st.caption("📦 This post is archived; comments are closed.")
+        return
+    
+    # Add comment or reply
+    reply_options = [None] + [comment.id for comment in comments]
+    reply_labels = {comment.id: f"{comment.username}: {comment.content[:40]}" for comment in comments}
+    reply_to = st.selectbox("Reply to", reply_options, key=f"reply_to_{post_id}",
+                            format_func=lambda cid: "New comment" if cid is None else reply_labels.get(cid, str(cid)))
+    new_comment = st.text_area("Add a comment", key=f"comment_{post_id}", placeholder="Write your comment here...")
+    if st.button("Post Comment", key=f"post_comment_{post_id}"):
+        if not new_comment.strip():
+            st.warning("Please write a comment before posting")
+        elif within_rate_limit("comment"):
+            if add_comment(post_id, st.session_state.user_id, new_comment, parent_id=reply_to):
+                # New top-level comments go first, so jump back to the first
+                # page; a reply lands right under its parent on this page
+                if reply_to is None:
+                    view.update(root_id=None, root_depth=0, cursors=[None])
+                st.success("Comment added!")
+            else:
+                st.error("Failed to add comment")
+
+
 # Main app
 if st.session_state.logged_in:
     # Sidebar controls
@@ -512,69 +579,60 @@ if st.session_state.logged_in:
     if choice == "Home":
         st.markdown('<div style="text-align: center"><h1 class="fade-in main-title">Welcome to GSV BLOGS! ✍</h1></div>', unsafe_allow_html=True)
         search_term = st.text_input("🔍 Search posts")
-        posts = get_all_posts(search_term)
+        feed = feed_loader.load_feed_page(search_term, st.session_state.user_id, comment_window)
+        posts = feed.posts
             
         if posts:
             for post in posts:
                 with st.container():
                     # Like button functionality
-                    liked = has_user_liked(post[0], st.session_state.user_id)
-                    like_count = get_likes_count(post[0])
+                    archived = post.archived
+                    liked = post.id in feed.liked
+                    like_count = feed.like_counts.get(post.id, 0)
+                    views = None if archived else track_view(post.id, feed.views.get(post.id, 0))
                     
                     # Create columns for the title and like button
                     col1, col2 = st.columns([4, 1])
                     with col1:
-                        st.markdown(f"<h3>{post[2]}</h3>", unsafe_allow_html=True)
+                        st.markdown(f"<h3>{post.title}</h3>", unsafe_allow_html=True)
                     with col2:
-                        like_key = f"like_{post[0]}"
+                        like_key = f"like_{post.id}"
                         if st.button(f"❤ {like_count}", key=like_key, 
                                    help="Click to like/unlike",
-                                   type="primary" if liked else "secondary"):
-                            if liked:
-                                remove_like(post[0], st.session_state.user_id)
-                            else:
-                                add_like(post[0], st.session_state.user_id)
-                            st.rerun()
+                                   type="primary" if liked else "secondary",
+                                   disabled=archived):
+                            if within_rate_limit("like"):
+                                if liked:
+                                    remove_like(post.id, st.session_state.user_id)
+                                else:
+                                    add_like(post.id, st.session_state.user_id)
+                                st.rerun()
+                        if views is not None:
+                            st.caption(f"👁 {views}")
                     
                     # Rest of the post content
                     st.markdown(f"""
                     <div class="post-card">
-                        <p><strong>Author:</strong> {post[1]} | <strong>Date:</strong> {post[4]}</p>
-                        <p>{post[3]}</p>
+                        <p><strong>Author:</strong> {post.author} | <strong>Date:</strong> {post.created_at}</p>
+                        <p>{post.content}</p>
                     </div>
                     """, unsafe_allow_html=True)
                     
+                    render_related_posts(feed.related[post.id])
+                    
                     # Comments section
                     st.subheader("💬 Comments")
-                    comments = get_comments(post[0])
-                    for comment in comments:
-                        st.markdown(f"""
-                        <div style="background-color: var(--light); padding: 10px; border-radius: 8px; margin: 5px 0;">
-                            <strong>{comment[5]}:</strong> {comment[3]}
-                            <div style="font-size: 0.8em; color: #666;">{comment[4]}</div>
-                        </div>
-                        """, unsafe_allow_html=True)
-                    
-                    # Add comment
-                    new_comment = st.text_area("Add a comment", key=f"comment_{post[0]}", placeholder="Write your comment here...")
-                    if st.button("Post Comment", key=f"post_comment_{post[0]}"):
-                        if new_comment.strip():
-                            if add_comment(post[0], st.session_state.user_id, new_comment):
-                                st.success("Comment added!")
-                            else:
-                                st.error("Failed to add comment")
-                        else:
-                            st.warning("Please write a comment before posting")
+                    render_comment_thread(post.id, feed.comments[post.id], archived=archived)
                     
                     # Share buttons
                     st.markdown("""
                     <div class="share-buttons">
                         <p style="margin-right: 10px; font-weight: bold;">Share:</p>
-                        <a href="https://twitter.com/intent/tweet?text=Check%20out%20this%20post:%20{post[2]}" 
+                        <a href="https://twitter.com/intent/tweet?text=Check%20out%20this%20post:%20{post.title}" 
                            class="share-button twitter-share" target="_blank">
                             Twitter
                         </a>
-                        <a href="https://wa.me/?text=Check%20out%20this%20post:%20{post[2]}" 
+                        <a href="https://wa.me/?text=Check%20out%20this%20post:%20{post.title}" 
                            class="share-button whatsapp-share" target="_blank">
                             WhatsApp
                         </a>
@@ -622,69 +680,60 @@ if st.session_state.logged_in:
         )
         if post_action == "View Posts":
             search_term = st.text_input("🔍 Search posts")
-            posts = get_all_posts(search_term)
+            feed = feed_loader.load_feed_page(search_term, st.session_state.user_id, comment_window)
+            posts = feed.posts
             
             if posts:
                 for post in posts:
                     with st.container():
                         # Like button functionality
-                        liked = has_user_liked(post[0], st.session_state.user_id)
-                        like_count = get_likes_count(post[0])
+                        archived = post.archived
+                        liked = post.id in feed.liked
+                        like_count = feed.like_counts.get(post.id, 0)
+                        views = None if archived else track_view(post.id, feed.views.get(post.id, 0))
                         
                         # Create columns for the title and like button
                         col1, col2 = st.columns([4, 1])
                         with col1:
-                            st.markdown(f"<h3>{post[2]}</h3>", unsafe_allow_html=True)
+                            st.markdown(f"<h3>{post.title}</h3>", unsafe_allow_html=True)
                         with col2:
-                            like_key = f"like_{post[0]}"
+                            like_key = f"like_{post.id}"
                             if st.button(f"❤ {like_count}", key=like_key, 
                                        help="Click to like/unlike",
-                                       type="primary" if liked else "secondary"):
-                                if liked:
-                                    remove_like(post[0], st.session_state.user_id)
-                                else:
-                                    add_like(post[0], st.session_state.user_id)
-                                st.rerun()
+                                       type="primary" if liked else "secondary",
+                                       disabled=archived):
+                                if within_rate_limit("like"):
+                                    if liked:
+                                        remove_like(post.id, st.session_state.user_id)
+                                    else:
+                                        add_like(post.id, st.session_state.user_id)
+                                    st.rerun()
+                            if views is not None:
+                                st.caption(f"👁 {views}")
                         
                         # Rest of the post content
                         st.markdown(f"""
                         <div class="post-card">
-                            <p><strong>Author:</strong> {post[1]} | <strong>Date:</strong> {post[4]}</p>
-                            <p>{post[3]}</p>
+                            <p><strong>Author:</strong> {post.author} | <strong>Date:</strong> {post.created_at}</p>
+                            <p>{post.content}</p>
                         </div>
                         """, unsafe_allow_html=True)
                         
+                        render_related_posts(feed.related[post.id])
+                        
                         # Comments section
                         st.subheader("💬 Comments")
-                        comments = get_comments(post[0])
-                        for comment in comments:
-                            st.markdown(f"""
-                            <div style="background-color: var(--light); padding: 10px; border-radius: 8px; margin: 5px 0;">
-                                <strong>{comment[5]}:</strong> {comment[3]}
-                                <div style="font-size: 0.8em; color: #666;">{comment[4]}</div>
-                            </div>
-                            """, unsafe_allow_html=True)
-                        
-                        # Add comment
-                        new_comment = st.text_area("Add a comment", key=f"comment_{post[0]}", placeholder="Write your comment here...")
-                        if st.button("Post Comment", key=f"post_comment_{post[0]}"):
-                            if new_comment.strip():
-                                if add_comment(post[0], st.session_state.user_id, new_comment):
-                                    st.success("Comment added!")
-                                else:
-                                    st.error("Failed to add comment")
-                            else:
-                                st.warning("Please write a comment before posting")
+                        render_comment_thread(post.id, feed.comments[post.id], archived=archived)
                         
                         # Share buttons
                         st.markdown("""
                         <div class="share-buttons">
                             <p style="margin-right: 10px; font-weight: bold;">Share:</p>
-                            <a href="https://twitter.com/intent/tweet?text=Check%20out%20this%20post:%20{post[2]}" 
+                            <a href="https://twitter.com/intent/tweet?text=Check%20out%20this%20post:%20{post.title}" 
                                class="share-button twitter-share" target="_blank">
                                 Twitter
                             </a>
-                            <a href="https://wa.me/?text=Check%20out%20this%20post:%20{post[2]}" 
+                            <a href="https://wa.me/?text=Check%20out%20this%20post:%20{post.title}" 
                                class="share-button whatsapp-share" target="_blank">
                                 WhatsApp
                             </a>
@@ -720,7 +769,7 @@ if st.session_state.logged_in:
             if st.button("Publish Post", key="publish_button"):
                 if not title or not content:
                     st.error("Title and content are required!")
-                else:
+                elif within_rate_limit("post"):
                     post_id = add_post(st.session_state.username, title, content, categories, tags)
                     if post_id:
                         st.success("🎉 Post published successfully!")
@@ -747,35 +796,48 @@ if st.session_state.logged_in:
         
         elif post_action == "Edit Posts":
             st.subheader("✏ Edit Your Posts")
-            user_posts = get_all_posts(author=st.session_state.username)
-            
-            if user_posts:
-                post_to_edit = st.radio("Select post to edit", 
-                                          [f"{post[0]} - {post[2]}" for post in user_posts],
-                                          key="edit_post_select")
+            post_id = render_post_picker("Select post to edit", "edit_post",
+                                         "You have no posts to edit yet. Create your first post!")
+            if post_id:
+                post = get_post_by_id(post_id)
                 
-                if post_to_edit:
-                    post_id = int(post_to_edit.split(" - ")[0])
-                    post = get_post_by_id(post_id)
+                if post:
+                    title = st.text_input("Title", post.title, key=f"edit_title_{post_id}")
+                    content = st.text_area("Content", post.content, height=300, key=f"edit_content_{post_id}")
                     
-                    if post:
-                        title = st.text_input("Title", post[2], key=f"edit_title_{post_id}")
-                        content = st.text_area("Content", post[3], height=300, key=f"edit_content_{post_id}")
-                        
-                        # Get current categories and tags
-                        current_categories = []
-                        categories = st.multiselect("Categories", ["Technology", "Travel", "Food", "Lifestyle", "Personal"],
-                                                  default=current_categories, key=f"edit_categories_{post_id}")
-                        
-                        tags = st.text_input("Tags (comma separated)", "", key=f"edit_tags_{post_id}")
-                        
-                        if st.button("Update Post", key=f"update_button_{post_id}"):
-                            if update_post(post_id, title, content, categories, tags):
-                                st.success("✅ Post updated successfully!")
-                            else:
-                                st.error("Failed to update post")
-            else:
-                st.info("You have no posts to edit yet. Create your first post!")
+                    # Get current categories and tags
+                    current_categories = []
+                    categories = st.multiselect("Categories", ["Technology", "Travel", "Food", "Lifestyle", "Personal"],
+                                              default=current_categories, key=f"edit_categories_{post_id}")
+                    
+                    tags = st.text_input("Tags (comma separated)", "", key=f"edit_tags_{post_id}")
+                    
+                    if st.button("Update Post", key=f"update_button_{post_id}"):
+                        if update_post(post_id, title, content, categories, tags):
+                            st.success("✅ Post updated successfully!")
+                        else:
+                            st.error("Failed to update post")
+                    
+                    # Revision history; the newest revision is the current text
+                    with st.expander("🕘 Revision history"):
+                        revisions = post_history.list_revisions(post_id)
+                        if len(revisions) < 2:
+                            st.caption("No earlier versions yet.")
+                        for revision in revisions[1:]:
+                            col1, col2 = st.columns([4, 1])
+                            with col1:
+                                st.markdown(f"**Revision {revision.revision}** · {revision.created_at} · "
+                                            f"{revision.size} bytes stored as {revision.kind}")
+                            with col2:
+                                if st.button("Restore", key=f"restore_{post_id}_{revision.revision}"):
+                                    restored = post_history.get_revision(post_id, revision.revision)
+                                    if restored and update_post(post_id, restored[0], restored[1]):
+                                        # Drop the edit widgets' state so they show the restored text
+                                        st.session_state.pop(f"edit_title_{post_id}", None)
+                                        st.session_state.pop(f"edit_content_{post_id}", None)
+                                        st.rerun()
+                                    else:
+                                        st.error("Failed to restore revision")
             st.markdown(
         """
         <div class="footer">
@@ -794,32 +856,24 @@ if st.session_state.logged_in:
     )
         elif post_action == "Delete Posts":
             st.subheader("🗑 Delete Your Posts")
-            user_posts = get_all_posts(author=st.session_state.username)
-            
-            if user_posts:
-                post_to_delete = st.radio("Select post to delete", 
-                                            [f"{post[0]} - {post[2]}" for post in user_posts],
-                                            key="delete_post_select")
+            post_id = render_post_picker("Select post to delete", "delete_post",
+                                         "You have no posts to delete.")
+            if post_id:
+                post = get_post_by_id(post_id)
                 
-                if post_to_delete:
-                    post_id = int(post_to_delete.split(" - ")[0])
-                    post = get_post_by_id(post_id)
+                if post:
+                    st.warning(f"⚠ You are about to delete: {post.title}")
+                    st.markdown(f"""
+                    <div style="background-color: #fff3cd; padding: 15px; border-radius: 8px; margin: 10px 0;">
+                        {post.content[:200] + "..." if len(post.content) > 200 else post.content}
+                    </div>
+                    """, unsafe_allow_html=True)
                     
-                    if post:
-                        st.warning(f"⚠ You are about to delete: {post[2]}")
-                        st.markdown(f"""
-                        <div style="background-color: #fff3cd; padding: 15px; border-radius: 8px; margin: 10px 0;">
-                            {post[3][:200] + "..." if len(post[3]) > 200 else post[3]}
-                        </div>
-                        """, unsafe_allow_html=True)
-                        
-                        if st.button("Confirm Delete", key=f"confirm_delete_{post_id}"):
-                            if delete_post(post_id):
-                                st.success("🗑 Post deleted successfully!")
-                            else:
-                                st.error("Failed to delete post")
-            else:
-                st.info("You have no posts to delete.")
+                    if st.button("Confirm Delete", key=f"confirm_delete_{post_id}"):
+                        if delete_post(post_id):
+                            st.success("🗑 Post deleted successfully!")
+                        else:
+                            st.error("Failed to delete post")
             st.markdown(
         """
         <div class="footer">
@@ -841,7 +895,7 @@ if st.session_state.logged_in:
         user = get_user(st.session_state.username)
         
         st.markdown("### Bio")
-        bio = st.text_area("", user[3] if user and user[3] else "", 
+        bio = st.text_area("", user.bio if user and user.bio else "", 
                           height=150, key="bio_textarea")
         
         if st.button("Update Profile", key="update_profile_button"):
@@ -849,6 +903,16 @@ if st.session_state.logged_in:
                 st.success("👍 Profile updated!")
             else:
                 st.error("Failed to update profile")
+        
+        # Write limits and how often they have kicked in
+        with st.expander("⏳ Write limits"):
+            my_throttles = rate_limit.user_throttle_counts(st.session_state.user_id)
+            all_stats = rate_limit.throttle_stats()
+            for action, limit in rate_limit.RATE_LIMITS.items():
+                st.markdown(f"**{action.title()}**: bursts of {limit['burst']}, then one every "
+                            f"{1 / limit['per_second']:.0f}s · you were throttled {my_throttles[action]} time(s) recently · "
+                            f"all users: {all_stats[action]['throttled']} throttled of "
+                            f"{all_stats[action]['allowed'] + all_stats[action]['throttled']} attempts")
 
     elif choice == "Contact Us":
         st.markdown("""
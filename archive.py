@@ -0,0 +1,130 @@
+import argparse
+import os
+import sqlite3
+
+BLOG_DB = 'database/blog.db'
+ARCHIVE_DB = 'database/archive.db'
+ARCHIVE_AFTER_DAYS = 365
+
+POST_COLUMNS = "id, author, title, content, created_at"
+COMMENT_COLUMNS = "id, post_id, user_id, content, created_at, parent_id, path, depth"
+LIKE_COLUMNS = "id, post_id, user_id, created_at"
+REVISION_COLUMNS = "id, post_id, revision, kind, data, created_at"
+
+def create_archive_tables(c):
+    c.execute('''CREATE TABLE IF NOT EXISTS archive.posts
+                 (id INTEGER PRIMARY KEY,
+                 author TEXT NOT NULL,
+                 title TEXT NOT NULL,
+                 content TEXT NOT NULL,
+                 created_at TIMESTAMP,
+                 views INTEGER NOT NULL DEFAULT 0)''')
+    # Archives created before view counting lack the column
+    post_columns = [row[1] for row in c.execute("PRAGMA archive.table_info(posts)")]
+    if 'views' not in post_columns:
+        c.execute("ALTER TABLE archive.posts ADD COLUMN views INTEGER NOT NULL DEFAULT 0")
+
+    c.execute('''CREATE TABLE IF NOT EXISTS archive.comments
+                 (id INTEGER PRIMARY KEY,
+                 post_id INTEGER NOT NULL,
+                 user_id INTEGER NOT NULL,
+                 content TEXT NOT NULL,
+                 created_at TIMESTAMP,
+                 parent_id INTEGER,
+                 path TEXT,
+                 depth INTEGER NOT NULL DEFAULT 0)''')
+    c.execute("CREATE INDEX IF NOT EXISTS archive.idx_comments_post_path ON comments(post_id, path)")
+
+    c.execute('''CREATE TABLE IF NOT EXISTS archive.likes
+                 (id INTEGER PRIMARY KEY,
+                 post_id INTEGER NOT NULL,
+                 user_id INTEGER NOT NULL,
+                 created_at TIMESTAMP,
+                 UNIQUE(post_id, user_id))''')
+
+    c.execute('''CREATE TABLE IF NOT EXISTS archive.post_revisions
+                 (id INTEGER PRIMARY KEY,
+                 post_id INTEGER NOT NULL,
+                 revision INTEGER NOT NULL,
+                 kind TEXT NOT NULL,
+                 data BLOB NOT NULL,
+                 created_at TIMESTAMP,
+                 UNIQUE(post_id, revision))''')
+
+# Attach the archive file to an open blog.db connection as schema "archive".
+# Returns False (and attaches nothing) when there is no archive yet, so
+# callers can skip the cold lookup entirely. Safe to call again on a
+# long-lived connection that already has the archive attached.
+def attach_archive(conn, create=False):
+    attached = conn.execute("SELECT 1 FROM pragma_database_list WHERE name = 'archive'").fetchone()
+    if attached and not create:
+        return True
+    if not attached:
+        if not create and not os.path.exists(ARCHIVE_DB):
+            return False
+        conn.execute("ATTACH DATABASE ? AS archive", (ARCHIVE_DB,))
+    if create:
+        create_archive_tables(conn.cursor())
+    return True
+
+# Move posts older than max_age_days, with their comments, likes and edit
+# history, from blog.db into archive.db in one transaction. blog.db runs in
+# WAL mode, where SQLite commits each attached file atomically but not the
+# pair together: a crash mid-commit can leave a post in both files. The
+# copies use INSERT OR REPLACE and reads prefer the hot copy, so simply
+# running the job again completes the move. Returns the ids of the archived
+# posts.
+def archive_old_posts(max_age_days=ARCHIVE_AFTER_DAYS, vacuum=False):
+    conn = sqlite3.connect(BLOG_DB)
+    attach_archive(conn, create=True)
+    c = conn.cursor()
+
+    c.execute("""CREATE TEMP TABLE archive_batch AS
+                 SELECT id FROM main.posts
+                 WHERE created_at < datetime('now', ?)""",
+             (f"-{int(max_age_days)} days",))
+    c.execute("SELECT id FROM archive_batch")
+    archived = [row[0] for row in c.fetchall()]
+
+    if archived:
+        c.execute(f"""INSERT OR REPLACE INTO archive.posts ({POST_COLUMNS}, views)
+                     SELECT {POST_COLUMNS}, views FROM main.posts
+                     WHERE id IN (SELECT id FROM archive_batch)""")
+        c.execute(f"""INSERT OR REPLACE INTO archive.comments ({COMMENT_COLUMNS})
+                     SELECT {COMMENT_COLUMNS} FROM main.comments
+                     WHERE post_id IN (SELECT id FROM archive_batch)""")
+        c.execute(f"""INSERT OR REPLACE INTO archive.likes ({LIKE_COLUMNS})
+                     SELECT {LIKE_COLUMNS} FROM main.likes
+                     WHERE post_id IN (SELECT id FROM archive_batch)""")
+        c.execute(f"""INSERT OR REPLACE INTO archive.post_revisions ({REVISION_COLUMNS})
+                     SELECT {REVISION_COLUMNS} FROM main.post_revisions
+                     WHERE post_id IN (SELECT id FROM archive_batch)""")
+        c.execute("DELETE FROM main.post_revisions WHERE post_id IN (SELECT id FROM archive_batch)")
+        c.execute("DELETE FROM main.likes WHERE post_id IN (SELECT id FROM archive_batch)")
+        c.execute("DELETE FROM main.comments WHERE post_id IN (SELECT id FROM archive_batch)")
+        c.execute("DELETE FROM main.posts WHERE id IN (SELECT id FROM archive_batch)")
+    conn.commit()
+
+    c.execute("DROP TABLE archive_batch")
+    if vacuum and archived:
+        # Give the freed pages back so the hot file actually shrinks
+        c.execute("VACUUM main")
+    conn.close()
+    return archived
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move old posts from blog.db into archive.db")
+    parser.add_argument("--days", type=int, default=ARCHIVE_AFTER_DAYS,
+                        help=f"archive posts older than this many days (default {ARCHIVE_AFTER_DAYS})")
+    parser.add_argument("--vacuum", action="store_true",
+                        help="VACUUM blog.db afterwards to reclaim space")
+    args = parser.parse_args()
+    archived = archive_old_posts(args.days, vacuum=args.vacuum)
+    if archived:
+        # Imported here: static_site and related_posts read through
+        # data_access, which imports this module
+        import related_posts
+        import static_site
+        static_site.posts_archived(archived)
+        related_posts.posts_removed(archived)
+    print(f"Archived {len(archived)} post(s) older than {args.days} days")
@@ -0,0 +1,114 @@
+# Queries and wall-clock time to assemble one feed page: the per-post lookups
+# the feed used to make (like count, whether the reader liked the post, view
+# count) against feed_loader.load_feed_page, which batches them per page.
+# Both build the comment threads and related posts the same way.
+#
+#   python benchmarks/feed_queries.py [--posts N] [--comments N] [--rounds N]
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import data_access
+import feed_loader
+import related_posts
+
+def seed(posts, comments_per_post, users):
+    data_access.create_tables()
+    rng = random.Random(7)
+    conn = sqlite3.connect(data_access.DB_PATH)
+    c = conn.cursor()
+    c.executemany("INSERT INTO users (username, password) VALUES (?, 'x')",
+                  ((f"user{i}",) for i in range(users)))
+    c.executemany("INSERT INTO posts (author, title, content, views) VALUES (?, ?, ?, ?)",
+                  ((f"user{i % users}", f"Post {i}", "lorem ipsum " * 200, rng.randint(0, 500))
+                   for i in range(posts)))
+    for post_id in range(1, posts + 1):
+        for _ in range(comments_per_post):
+            c.execute("INSERT INTO comments (post_id, user_id, content) VALUES (?, ?, 'nice post')",
+                      (post_id, rng.randint(1, users)))
+            c.execute("UPDATE comments SET path = ? WHERE id = ?",
+                      (data_access.comment_path_segment(c.lastrowid), c.lastrowid))
+        c.executemany("INSERT OR IGNORE INTO likes (post_id, user_id) VALUES (?, ?)",
+                      ((post_id, rng.randint(1, users)) for _ in range(20)))
+    conn.commit()
+    conn.close()
+
+def comment_window(post_id):
+    return {"root_id": None, "max_depth": 3, "after_path": None, "limit": 21}
+
+# The feed's reads before load_feed_page: three single-post queries per post
+def load_per_post(search_term, user_id):
+    posts = data_access.get_all_posts(search_term)
+    c = data_access.get_connection().cursor()
+    like_counts, liked, views = {}, set(), {}
+    for post in posts:
+        c.execute("SELECT COUNT(*) FROM likes WHERE post_id = ?", (post.id,))
+        like_counts[post.id] = c.fetchone()[0]
+        c.execute("SELECT 1 FROM likes WHERE post_id = ? AND user_id = ?", (post.id, user_id))
+        if c.fetchone() is not None:
+            liked.add(post.id)
+        c.execute("SELECT views FROM posts WHERE id = ?", (post.id,))
+        views[post.id] = c.fetchone()[0]
+    windows = {post.id: {**comment_window(post.id), "archived": False} for post in posts}
+    return feed_loader.FeedPage(
+        posts=posts,
+        like_counts=like_counts,
+        liked=liked,
+        views=views,
+        comments=feed_loader.comment_threads(windows),
+        related=feed_loader.related_summaries([post.id for post in posts]),
+    )
+
+def load_batched(search_term, user_id):
+    return feed_loader.load_feed_page(search_term, user_id, comment_window)
+
+def count_statements(load):
+    statements = []
+    conn = data_access.get_connection()
+    conn.set_trace_callback(statements.append)
+    try:
+        load(None, 1)
+    finally:
+        conn.set_trace_callback(None)
+    return len(statements)
+
+# Median wall-clock ms per loader. Rounds alternate between the loaders so
+# background noise hits both alike.
+def median_ms(loads, rounds):
+    samples = {name: [] for name in loads}
+    for _ in range(rounds):
+        for name, load in loads.items():
+            start = time.perf_counter()
+            load(None, 1)
+            samples[name].append((time.perf_counter() - start) * 1000)
+    return {name: statistics.median(times) for name, times in samples.items()}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark feed page assembly")
+    parser.add_argument("--posts", type=int, default=200)
+    parser.add_argument("--comments", type=int, default=30)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_access.DB_PATH = os.path.join(tmp, "blog.db")
+        related_posts.RELATED_DIR = os.path.join(tmp, "related")
+        seed(args.posts, args.comments, users=50)
+        assert load_per_post(None, 1) == load_batched(None, 1)
+        loads = {"per post": load_per_post, "batched": load_batched}
+        # Warm the page cache and the statement cache first
+        median_ms(loads, 2)
+        statements = {name: count_statements(load) for name, load in loads.items()}
+        times = median_ms(loads, args.rounds)
+
+    print(f"posts {args.posts}, comments/post {args.comments}")
+    for name in loads:
+        print(f"{name:<10} {statements[name]:>5} statements {times[name]:8.1f} ms median")
+    print(f"batched takes {times['batched'] / times['per post']:.0%} of the per-post time")
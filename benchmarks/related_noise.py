@@ -0,0 +1,64 @@
+# Similarity that hashed TF-IDF vectors give unrelated posts, per DIM, on a
+# synthetic corpus of topics that share a general vocabulary. MIN_SCORE in
+# related_posts should sit above the cross-topic scores and below most
+# same-topic ones; "cross >= min" is the share of unrelated pairs it lets
+# through.
+#
+#   python benchmarks/related_noise.py [--topics N] [--docs N] [--dims 512,1024,2048]
+import argparse
+import os
+import random
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import related_posts
+
+def make_corpus(topics, docs_per_topic, words, topic_share):
+    rng = random.Random(1)
+    general = [f"word{i}" for i in range(3000)]
+    vocab = [[f"topic{t}term{i}" for i in range(150)] for t in range(topics)]
+    corpus = []
+    for topic in range(topics):
+        for _ in range(docs_per_topic):
+            tokens = [rng.choice(vocab[topic]) if rng.random() < topic_share else rng.choice(general)
+                      for _ in range(words)]
+            corpus.append((topic, " ".join(tokens[:6]), " ".join(tokens[6:])))
+    return corpus
+
+def similarities(corpus, dim):
+    related_posts.DIM = dim
+    counts = np.array([related_posts.term_counts(title, content) for _, title, content in corpus])
+    df = np.zeros(dim + 1, dtype=np.float64)
+    df[:dim] = (counts > 0).sum(axis=0)
+    df[dim] = len(corpus)
+    vectors = related_posts.tfidf(counts, df)
+    return vectors @ vectors.T
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure the related-posts similarity noise floor")
+    parser.add_argument("--topics", type=int, default=10)
+    parser.add_argument("--docs", type=int, default=60, help="posts per topic")
+    parser.add_argument("--words", type=int, default=250, help="words per post")
+    parser.add_argument("--topic-share", type=float, default=0.4,
+                        help="fraction of each post's words drawn from its topic")
+    parser.add_argument("--dims", default="256,512,1024,2048")
+    args = parser.parse_args()
+
+    corpus = make_corpus(args.topics, args.docs, args.words, args.topic_share)
+    labels = np.array([topic for topic, _, _ in corpus])
+    same = labels[:, None] == labels[None, :]
+    cross = ~same
+    np.fill_diagonal(same, False)
+
+    print(f"{len(corpus)} posts, {args.topics} topics, MIN_SCORE {related_posts.MIN_SCORE}")
+    print(f"{'dim':>6}  {'cross mean':>10} {'cross p99':>9} {'cross max':>9} {'cross >= min':>12}"
+          f"  {'same p1':>7} {'same mean':>9}")
+    for dim in (int(d) for d in args.dims.split(",")):
+        scores = similarities(corpus, dim)
+        let_through = (scores[cross] >= related_posts.MIN_SCORE).mean()
+        print(f"{dim:>6}  {scores[cross].mean():>10.3f} {np.percentile(scores[cross], 99):>9.3f} "
+              f"{scores[cross].max():>9.3f} {let_through:>12.2%}"
+              f"  {np.percentile(scores[same], 1):>7.3f} {scores[same].mean():>9.3f}")
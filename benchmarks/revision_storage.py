@@ -0,0 +1,80 @@
+# Storage used by post_history for a heavily edited post, against keeping a
+# full copy of every version, plus the cost of rebuilding a revision.
+#
+#   python benchmarks/revision_storage.py [--edits N] [--paragraphs N]
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import data_access
+import post_history
+
+WORDS = ("the quick brown fox jumps over lazy dog while readers write posts about "
+         "travel food code music books coffee rain city light river mountain").split()
+
+def paragraph(rng):
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(40, 120)))
+
+# One small edit: rewrite, insert or delete a single paragraph
+def edit(rng, paragraphs):
+    paragraphs = list(paragraphs)
+    action = rng.random()
+    index = rng.randrange(len(paragraphs))
+    if action < 0.6:
+        paragraphs[index] = paragraph(rng)
+    elif action < 0.8 or len(paragraphs) < 3:
+        paragraphs.insert(index, paragraph(rng))
+    else:
+        del paragraphs[index]
+    return paragraphs
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure revision history storage and rebuild cost")
+    parser.add_argument("--edits", type=int, default=200)
+    parser.add_argument("--paragraphs", type=int, default=20)
+    args = parser.parse_args()
+    rng = random.Random(42)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_access.DB_PATH = os.path.join(tmp, "blog.db")
+        data_access.create_tables()
+        conn = sqlite3.connect(data_access.DB_PATH)
+        c = conn.cursor()
+
+        paragraphs = [paragraph(rng) for _ in range(args.paragraphs)]
+        title, content = "Draft", "\n".join(paragraphs)
+        c.execute("INSERT INTO posts (author, title, content) VALUES ('bench', ?, ?)", (title, content))
+        post_id = c.lastrowid
+        full_copies = len(post_history.join_text(title, content).encode())
+        versions = [(title, content)]
+
+        for number in range(args.edits):
+            paragraphs = edit(rng, paragraphs)
+            new_title, new_content = f"Draft {number + 1}", "\n".join(paragraphs)
+            post_history.record_revision(c, post_id, title, content, new_title, new_content)
+            c.execute("UPDATE posts SET title = ?, content = ? WHERE id = ?", (new_title, new_content, post_id))
+            title, content = new_title, new_content
+            full_copies += len(post_history.join_text(title, content).encode())
+            versions.append((title, content))
+        conn.commit()
+
+        c.execute("SELECT SUM(LENGTH(data)), SUM(kind = 'snapshot') FROM post_revisions WHERE post_id = ?",
+                  (post_id,))
+        stored, snapshots = c.fetchone()
+
+        start = time.perf_counter()
+        for revision, expected in enumerate(versions, start=1):
+            assert post_history.get_revision(post_id, revision) == expected
+        rebuild_ms = (time.perf_counter() - start) * 1000 / len(versions)
+        conn.close()
+
+    print(f"revisions          {len(versions)} ({snapshots} snapshots)")
+    print(f"full copies        {full_copies / 1024:9.1f} KiB")
+    print(f"post_revisions     {stored / 1024:9.1f} KiB  ({stored / full_copies:.1%} of full copies)")
+    print(f"rebuild revision   {rebuild_ms:9.2f} ms average (max {post_history.SNAPSHOT_EVERY - 1} deltas)")
@@ -0,0 +1,64 @@
+# Compare memory held by 10k loaded posts: raw SELECT * tuples (the old
+# get_all_posts) against the PostRow rows returned by data_access.
+#
+#   python benchmarks/row_memory.py [--posts N] [--content-size BYTES]
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import data_access
+
+def seed(path, posts, content_size):
+    conn = sqlite3.connect(path)
+    c = conn.cursor()
+    c.execute('''CREATE TABLE posts
+                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                 author TEXT NOT NULL,
+                 title TEXT NOT NULL,
+                 content TEXT NOT NULL,
+                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''')
+    c.executemany("INSERT INTO posts (author, title, content) VALUES (?, ?, ?)",
+                  ((f"author{i % 50}", f"Post number {i}", "x" * content_size)
+                   for i in range(posts)))
+    conn.commit()
+    conn.close()
+
+def measure(load):
+    tracemalloc.start()
+    rows = load()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return len(rows), current
+
+def load_tuples(path):
+    conn = sqlite3.connect(path)
+    rows = conn.execute("SELECT * FROM posts ORDER BY id DESC").fetchall()
+    conn.close()
+    return rows
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare memory held by loaded post rows")
+    parser.add_argument("--posts", type=int, default=10_000)
+    parser.add_argument("--content-size", type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "blog.db")
+        seed(path, args.posts, args.content_size)
+        data_access.DB_PATH = path
+        data_access.get_connection()
+
+        results = [
+            ("SELECT * tuples", measure(lambda: load_tuples(path))),
+            ("PostRow (data_access)", measure(data_access.get_all_posts)),
+        ]
+
+    baseline = results[0][1][1]
+    for label, (count, size) in results:
+        print(f"{label:<24} {count:>7} rows  {size / 1024:>9.1f} KiB  "
+              f"{size / count:>7.1f} B/row  {size / baseline:>6.1%}")
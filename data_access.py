@@ -0,0 +1,410 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import weakref
+from typing import NamedTuple, Optional
+
+from archive import BLOG_DB, POST_COLUMNS, attach_archive
+
+DB_PATH = BLOG_DB
+# Prepared statements kept per connection; the read queries below come in a
+# handful of shapes, so this comfortably holds all of them
+STATEMENT_CACHE_SIZE = 64
+# Idle read connections kept per database file for the next thread; extras
+# are closed when their thread exits
+IDLE_CONNECTIONS = 8
+
+# Row types. Each query selects exactly these columns, in this order. Rows
+# are tuples underneath (no per-instance __dict__), so the narrower the
+# projection, the smaller the row.
+class UserRow(NamedTuple):
+    id: int
+    username: str
+
+class UserProfileRow(NamedTuple):
+    id: int
+    username: str
+    bio: Optional[str]
+    created_at: str
+
+class PostRow(NamedTuple):
+    id: int
+    author: str
+    title: str
+    content: str
+    created_at: str
+    archived: int
+
+class PostSummaryRow(NamedTuple):
+    id: int
+    author: str
+    title: str
+    created_at: str
+
+class PostTitleRow(NamedTuple):
+    id: int
+    title: str
+
+class PostStatsRow(NamedTuple):
+    post_id: int
+    version: int
+    like_count: int
+    comment_count: int
+
+class CommentRow(NamedTuple):
+    id: int
+    post_id: int
+    user_id: int
+    content: str
+    created_at: str
+    username: str
+    parent_id: Optional[int]
+    depth: int
+    path: str
+    has_replies: bool
+
+# Read connections are pooled per process and database file. A thread
+# borrows one on its first read and keeps it for as long as it runs, since
+# sqlite3 connections must not be used by two threads at once. When the
+# thread exits the connection goes back to the pool instead of being closed.
+# Streamlit starts a fresh script thread for every rerun, so a purely
+# thread-local connection (and its prepared-statement cache) would last
+# only one interaction; pooled, the cache survives reruns.
+_local = threading.local()
+_idle = {}
+_idle_lock = threading.Lock()
+
+class _Lease:
+    def __init__(self, conn):
+        self.conn = conn
+
+def _release(path, conn):
+    with _idle_lock:
+        idle = _idle.setdefault(path, [])
+        if len(idle) < IDLE_CONNECTIONS:
+            idle.append(conn)
+            return
+    conn.close()
+
+def get_connection():
+    leases = getattr(_local, "leases", None)
+    if leases is None:
+        leases = _local.leases = {}
+    lease = leases.get(DB_PATH)
+    if lease is None:
+        with _idle_lock:
+            idle = _idle.get(DB_PATH)
+            conn = idle.pop() if idle else None
+        if conn is None:
+            conn = sqlite3.connect(DB_PATH, cached_statements=STATEMENT_CACHE_SIZE,
+                                   check_same_thread=False)
+            # These connections only ever read; writes open their own
+            conn.execute("PRAGMA query_only = ON")
+        lease = leases[DB_PATH] = _Lease(conn)
+        # Runs when the thread's locals are dropped, i.e. when it exits
+        weakref.finalize(lease, _release, DB_PATH, conn)
+    return lease.conn
+
+# Schema setup and in-place migrations, shared by every entry point (the
+# Streamlit app, the JSON API and the batch jobs)
+def create_tables():
+    os.makedirs(os.path.dirname(DB_PATH) or '.', exist_ok=True)
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    # WAL lets every session's reads run alongside a writer (a post being
+    # saved, the view counter's flush); the setting is stored in the file
+    c.execute("PRAGMA journal_mode=WAL")
+
+    # Users table
+    c.execute('''CREATE TABLE IF NOT EXISTS users
+                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                 username TEXT UNIQUE NOT NULL,
+                 password TEXT NOT NULL,
+                 bio TEXT,
+                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''')
+
+    # Posts table - simplified without image_path
+    c.execute('''CREATE TABLE IF NOT EXISTS posts
+                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                 author TEXT NOT NULL,
+                 title TEXT NOT NULL,
+                 content TEXT NOT NULL,
+                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''')
+
+    # Comments table
+    c.execute('''CREATE TABLE IF NOT EXISTS comments
+                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                 post_id INTEGER NOT NULL,
+                 user_id INTEGER NOT NULL,
+                 content TEXT NOT NULL,
+                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                 FOREIGN KEY(post_id) REFERENCES posts(id),
+                 FOREIGN KEY(user_id) REFERENCES users(id))''')
+
+    # Likes table
+    c.execute('''CREATE TABLE IF NOT EXISTS likes
+                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                 post_id INTEGER NOT NULL,
+                 user_id INTEGER NOT NULL,
+                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                 FOREIGN KEY(post_id) REFERENCES posts(id),
+                 FOREIGN KEY(user_id) REFERENCES users(id),
+                 UNIQUE(post_id, user_id))''')
+
+    # Bumped on every edit so API clients can revalidate with ETags
+    post_columns = [row[1] for row in c.execute("PRAGMA table_info(posts)")]
+    if 'version' not in post_columns:
+        c.execute("ALTER TABLE posts ADD COLUMN version INTEGER NOT NULL DEFAULT 1")
+    # Written in batches by view_counter
+    if 'views' not in post_columns:
+        c.execute("ALTER TABLE posts ADD COLUMN views INTEGER NOT NULL DEFAULT 0")
+
+    # Threaded comments: parent_id plus a materialized path of zero-padded
+    # ancestor segments, so a whole subtree is one range scan on (post_id, path)
+    comment_columns = [row[1] for row in c.execute("PRAGMA table_info(comments)")]
+    if 'parent_id' not in comment_columns:
+        c.execute("ALTER TABLE comments ADD COLUMN parent_id INTEGER REFERENCES comments(id)")
+    if 'path' not in comment_columns:
+        c.execute("ALTER TABLE comments ADD COLUMN path TEXT")
+    if 'depth' not in comment_columns:
+        c.execute("ALTER TABLE comments ADD COLUMN depth INTEGER NOT NULL DEFAULT 0")
+    # Existing flat comments become top-level threads
+    c.execute("SELECT id FROM comments WHERE path IS NULL")
+    c.executemany("UPDATE comments SET path = ? WHERE id = ?",
+                  [(comment_path_segment(row[0]), row[0]) for row in c.fetchall()])
+    c.execute("CREATE INDEX IF NOT EXISTS idx_comments_post_path ON comments(post_id, path)")
+    # Covers the title-only author listings (get_post_titles)
+    c.execute("CREATE INDEX IF NOT EXISTS idx_posts_author_id ON posts(author, id, title)")
+
+    # Edit history, see post_history
+    c.execute('''CREATE TABLE IF NOT EXISTS post_revisions
+                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                 post_id INTEGER NOT NULL,
+                 revision INTEGER NOT NULL,
+                 kind TEXT NOT NULL,
+                 data BLOB NOT NULL,
+                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                 FOREIGN KEY(post_id) REFERENCES posts(id),
+                 UNIQUE(post_id, revision))''')
+
+    conn.commit()
+    conn.close()
+
+def login_user(username, password):
+    hashed_password = hashlib.sha256(password.encode()).hexdigest()
+    c = get_connection().cursor()
+    c.execute("SELECT id, username FROM users WHERE username = ? AND password = ?",
+             (username, hashed_password))
+    user = c.fetchone()
+    return UserRow._make(user) if user else None
+
+def get_user(username):
+    c = get_connection().cursor()
+    c.execute("SELECT id, username, bio, created_at FROM users WHERE username = ?", (username,))
+    user = c.fetchone()
+    return UserProfileRow._make(user) if user else None
+
+# The feed only reads the hot blog.db; a search also falls through to
+# archive.db, with PostRow.archived telling the two apart.
+def get_all_posts(search_term=None, author=None):
+    conn = get_connection()
+    c = conn.cursor()
+
+    where = ""
+    params = []
+
+    if search_term or author:
+        where += " WHERE"
+        if search_term:
+            where += " (title LIKE ? OR content LIKE ?)"
+            params.extend([f"%{search_term}%", f"%{search_term}%"])
+        if author:
+            if search_term:
+                where += " AND"
+            where += " author = ?"
+            params.append(author)
+
+    query = f"SELECT {POST_COLUMNS}, 0 AS archived FROM main.posts" + where
+    if search_term and attach_archive(conn):
+        # A crash during the archive job can leave a post in both files; the
+        # hot copy wins, as in get_post_by_id
+        query += (f" UNION ALL SELECT {POST_COLUMNS}, 1 AS archived FROM archive.posts" + where
+                  + " AND id NOT IN (SELECT id FROM main.posts)")
+        params = params * 2
+
+    query += " ORDER BY id DESC"
+    c.execute(query, params)
+    return list(map(PostRow._make, c.fetchall()))
+
+def get_post_by_id(post_id):
+    conn = get_connection()
+    c = conn.cursor()
+    c.execute(f"SELECT {POST_COLUMNS}, 0 AS archived FROM main.posts WHERE id = ?", (post_id,))
+    post = c.fetchone()
+    if post is None and attach_archive(conn):
+        c.execute(f"SELECT {POST_COLUMNS}, 1 AS archived FROM archive.posts WHERE id = ?", (post_id,))
+        post = c.fetchone()
+    return PostRow._make(post) if post else None
+
+# One author's posts as (id, title), newest first, for pickers. Answered
+# from idx_posts_author_id alone, without touching post bodies. Pass the
+# smallest id of the previous page as before_id for the next page.
+def get_post_titles(author, search_term=None, before_id=None, limit=20):
+    query = "SELECT id, title FROM posts WHERE author = ?"
+    params = [author]
+    if before_id is not None:
+        query += " AND id < ?"
+        params.append(before_id)
+    if search_term:
+        query += " AND title LIKE ?"
+        params.append(f"%{search_term}%")
+    query += " ORDER BY id DESC LIMIT ?"
+    params.append(limit)
+    c = get_connection().cursor()
+    c.execute(query, params)
+    return list(map(PostTitleRow._make, c.fetchall()))
+
+# Keyset pagination over the hot feed, newest first: pass the smallest id
+# of the previous page as before_id to get the next one
+def get_feed_page(before_id=None, limit=20):
+    c = get_connection().cursor()
+    if before_id is None:
+        c.execute(f"SELECT {POST_COLUMNS}, 0 AS archived FROM posts ORDER BY id DESC LIMIT ?",
+                 (limit,))
+    else:
+        c.execute(f"SELECT {POST_COLUMNS}, 0 AS archived FROM posts WHERE id < ? ORDER BY id DESC LIMIT ?",
+                 (before_id, limit))
+    return list(map(PostRow._make, c.fetchall()))
+
+# Version and counters for a batch of posts in one query, keyed by post id.
+# Archived posts are never edited, so they all report version 1.
+def get_post_stats(post_ids, archived=False):
+    if not post_ids:
+        return {}
+    conn = get_connection()
+    schema, version = "main", "posts.version"
+    if archived:
+        if not attach_archive(conn):
+            return {}
+        schema, version = "archive", "1"
+    placeholders = ",".join("?" * len(post_ids))
+    c = conn.cursor()
+    c.execute(f"""SELECT posts.id, {version},
+                        (SELECT COUNT(*) FROM {schema}.likes WHERE likes.post_id = posts.id),
+                        (SELECT COUNT(*) FROM {schema}.comments WHERE comments.post_id = posts.id)
+                 FROM {schema}.posts AS posts
+                 WHERE posts.id IN ({placeholders})""", list(post_ids))
+    return {row[0]: PostStatsRow._make(row) for row in c.fetchall()}
+
+# Listing rows without the post body. Offsets count from the oldest post
+# unless newest_first is set.
+def get_post_summaries(limit, offset=0, newest_first=False):
+    c = get_connection().cursor()
+    order = "DESC" if newest_first else "ASC"
+    c.execute(f"SELECT id, author, title, created_at FROM posts ORDER BY id {order} LIMIT ? OFFSET ?",
+             (limit, offset))
+    return list(map(PostSummaryRow._make, c.fetchall()))
+
+# Listing rows for the given ids, in the order the ids were given. Ids that
+# are not (or no longer) in the hot database are skipped.
+def get_post_summaries_by_ids(post_ids):
+    if not post_ids:
+        return []
+    placeholders = ",".join("?" * len(post_ids))
+    c = get_connection().cursor()
+    c.execute(f"SELECT id, author, title, created_at FROM posts WHERE id IN ({placeholders})",
+             list(post_ids))
+    rows = {row[0]: PostSummaryRow._make(row) for row in c.fetchall()}
+    return [rows[post_id] for post_id in post_ids if post_id in rows]
+
+# Number of hot posts, or of hot posts older than before_id
+def count_posts(before_id=None):
+    c = get_connection().cursor()
+    if before_id is None:
+        c.execute("SELECT COUNT(*) FROM posts")
+    else:
+        c.execute("SELECT COUNT(*) FROM posts WHERE id < ?", (before_id,))
+    return c.fetchone()[0]
+
+# A comment's path is its ancestors' segments and its own, joined by "/".
+# Segments count down from the largest id that fits COMMENT_PATH_WIDTH
+# digits, so ORDER BY path lists every level newest first while each reply
+# still follows its parent.
+COMMENT_PATH_WIDTH = 10
+
+def comment_path_segment(comment_id):
+    return str(10 ** COMMENT_PATH_WIDTH - 1 - comment_id).zfill(COMMENT_PATH_WIDTH)
+
+# Comments come back in thread display order: parents before their replies,
+# and each level newest first. has_replies tells whether a comment has
+# replies at all, even ones cut off by max_depth.
+# root_id narrows to one subtree, max_depth is relative to that root, and
+# after_path/limit page through long threads by path (keyset pagination).
+# archived=True reads the thread of a post that lives in archive.db.
+def get_comments(post_id, root_id=None, max_depth=None, after_path=None, limit=None, archived=False):
+    conn = get_connection()
+    c = conn.cursor()
+    schema = "main"
+    if archived:
+        if not attach_archive(conn):
+            return []
+        schema = "archive"
+    query = f"""SELECT comments.id, comments.post_id, comments.user_id, comments.content,
+                      comments.created_at, users.username, comments.parent_id,
+                      comments.depth, comments.path,
+                      EXISTS (SELECT 1 FROM {schema}.comments AS reply
+                              WHERE reply.post_id = comments.post_id
+                              AND reply.path > comments.path || '/'
+                              AND reply.path < comments.path || '0')
+              FROM {schema}.comments AS comments
+              JOIN users ON comments.user_id = users.id
+              WHERE comments.post_id = ?"""
+    params = [post_id]
+    base_depth = 0
+
+    if root_id is not None:
+        c.execute(f"SELECT path, depth FROM {schema}.comments WHERE id = ? AND post_id = ?",
+                 (root_id, post_id))
+        root = c.fetchone()
+        if root is None:
+            return []
+        root_path, base_depth = root
+        # The root itself plus everything under "<root_path>/"; '0' sorts
+        # right after '/', so this is a single range on the path index
+        query += " AND comments.path >= ? AND comments.path < ?"
+        params.extend([root_path, root_path + '0'])
+
+    if max_depth is not None:
+        query += " AND comments.depth <= ?"
+        params.append(base_depth + max_depth)
+    if after_path is not None:
+        query += " AND comments.path > ?"
+        params.append(after_path)
+
+    query += " ORDER BY comments.path"
+    if limit is not None:
+        query += " LIMIT ?"
+        params.append(limit)
+
+    c.execute(query, params)
+    return list(map(CommentRow._make, c.fetchall()))
+
+# Stored view counts for a batch of hot posts
+def get_view_counts(post_ids):
+    if not post_ids:
+        return {}
+    placeholders = ",".join("?" * len(post_ids))
+    c = get_connection().cursor()
+    c.execute(f"SELECT id, views FROM posts WHERE id IN ({placeholders})", list(post_ids))
+    return dict(c.fetchall())
+
+# The subset of post_ids this user has liked
+def get_liked_post_ids(post_ids, user_id):
+    if not post_ids:
+        return set()
+    placeholders = ",".join("?" * len(post_ids))
+    c = get_connection().cursor()
+    c.execute(f"SELECT post_id FROM likes WHERE user_id = ? AND post_id IN ({placeholders})",
+             [user_id, *post_ids])
+    return {row[0] for row in c.fetchall()}
@@ -0,0 +1,51 @@
+from typing import NamedTuple
+
+import related_posts
+import view_counter
+from data_access import (get_all_posts, get_comments, get_liked_post_ids, get_post_stats,
+                         get_post_summaries_by_ids)
+
+# The feed used to look up each post's like count, whether the reader liked
+# it and its view count with three queries per post. load_feed_page reads
+# each of those once for the whole page, and gathers every post's comment
+# thread and related posts alongside, so both feed pages render from one
+# FeedPage.
+
+class FeedPage(NamedTuple):
+    posts: list
+    like_counts: dict
+    liked: set
+    views: dict
+    comments: dict
+    related: dict
+
+# Comment threads for several posts as {post_id: rows}. windows maps each
+# post to its get_comments arguments, plus whether the post is archived.
+def comment_threads(windows):
+    return {post_id: get_comments(post_id, window["root_id"], window["max_depth"],
+                                  window["after_path"], window["limit"], window["archived"])
+            for post_id, window in windows.items()}
+
+def related_summaries(post_ids):
+    return {post_id: get_post_summaries_by_ids(related_posts.related_post_ids(post_id))
+            for post_id in post_ids}
+
+# Everything the feed renders for one request. comment_window(post_id)
+# returns the get_comments keyword arguments (root_id, max_depth, after_path,
+# limit) for that post's thread as the reader currently has it expanded; it
+# may read Streamlit session state.
+def load_feed_page(search_term, user_id, comment_window):
+    posts = get_all_posts(search_term)
+    hot_ids = [post.id for post in posts if not post.archived]
+    archived_ids = [post.id for post in posts if post.archived]
+    windows = {post.id: {**comment_window(post.id), "archived": bool(post.archived)} for post in posts}
+
+    stats = {**get_post_stats(hot_ids), **get_post_stats(archived_ids, archived=True)}
+    return FeedPage(
+        posts=posts,
+        like_counts={post_id: row.like_count for post_id, row in stats.items()},
+        liked=get_liked_post_ids(hot_ids, user_id),
+        views=view_counter.view_counts(hot_ids),
+        comments=comment_threads(windows),
+        related=related_summaries([post.id for post in posts]),
+    )
@@ -0,0 +1,109 @@
+import difflib
+import json
+import zlib
+from typing import NamedTuple
+
+from data_access import get_connection
+
+# Every edit of a post is kept in post_revisions. Most rows are deltas: the
+# line-level diff against the previous revision, zlib-compressed. Every
+# SNAPSHOT_EVERY revisions (and whenever a delta would not be smaller than
+# the full text) a compressed snapshot is stored instead, so rebuilding any
+# revision takes one snapshot plus at most SNAPSHOT_EVERY - 1 deltas.
+#
+# Revision 1 is the post as first published. It is only written on the
+# first edit, so posts that are never edited cost nothing. The newest
+# revision always matches the row in posts.
+SNAPSHOT_EVERY = 8
+
+class RevisionRow(NamedTuple):
+    revision: int
+    kind: str
+    size: int
+    created_at: str
+
+# A revision is stored as one text: the title on the first line, then the
+# content (titles come from a single-line input)
+def join_text(title, content):
+    return f"{title}\n{content}"
+
+def split_text(text):
+    title, _, content = text.partition("\n")
+    return title, content
+
+# Delta ops: ["c", i1, i2] copies lines i1:i2 of the previous revision,
+# ["i", text] inserts new text
+def make_delta(old_text, new_text):
+    old_lines = old_text.splitlines(keepends=True)
+    new_lines = new_text.splitlines(keepends=True)
+    ops = []
+    matcher = difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            ops.append(["c", i1, i2])
+        elif j2 > j1:
+            ops.append(["i", "".join(new_lines[j1:j2])])
+    return ops
+
+def apply_delta(old_text, ops):
+    old_lines = old_text.splitlines(keepends=True)
+    parts = []
+    for op in ops:
+        if op[0] == "c":
+            parts.extend(old_lines[op[1]:op[2]])
+        else:
+            parts.append(op[1])
+    return "".join(parts)
+
+def encode(data):
+    return zlib.compress(data.encode("utf-8"), 9)
+
+def decode(blob):
+    return zlib.decompress(blob).decode("utf-8")
+
+# Record an edit inside the caller's transaction, before posts is updated.
+# old_title/old_content are the current row, new_title/new_content the edit.
+def record_revision(c, post_id, old_title, old_content, new_title, new_content):
+    c.execute("SELECT MAX(revision) FROM post_revisions WHERE post_id = ?", (post_id,))
+    latest = c.fetchone()[0]
+    old_text = join_text(old_title, old_content)
+    if latest is None:
+        c.execute("""INSERT INTO post_revisions (post_id, revision, kind, data, created_at)
+                     SELECT id, 1, 'snapshot', ?, created_at FROM posts WHERE id = ?""",
+                 (encode(old_text), post_id))
+        latest = 1
+
+    new_text = join_text(new_title, new_content)
+    revision = latest + 1
+    snapshot = encode(new_text)
+    kind, data = "snapshot", snapshot
+    if (revision - 1) % SNAPSHOT_EVERY != 0:
+        delta = encode(json.dumps(make_delta(old_text, new_text), separators=(",", ":")))
+        if len(delta) < len(snapshot):
+            kind, data = "delta", delta
+    c.execute("""INSERT INTO post_revisions (post_id, revision, kind, data)
+                 VALUES (?, ?, ?, ?)""", (post_id, revision, kind, data))
+    return revision
+
+def list_revisions(post_id):
+    c = get_connection().cursor()
+    c.execute("""SELECT revision, kind, LENGTH(data), created_at FROM post_revisions
+                 WHERE post_id = ? ORDER BY revision DESC""", (post_id,))
+    return list(map(RevisionRow._make, c.fetchall()))
+
+# (title, content) of a revision, or None if it does not exist. Reads the
+# nearest snapshot at or before it and replays the deltas after that.
+def get_revision(post_id, revision):
+    c = get_connection().cursor()
+    c.execute("""SELECT revision, kind, data FROM post_revisions
+                 WHERE post_id = ? AND revision <= ? AND revision >= (
+                     SELECT MAX(revision) FROM post_revisions
+                     WHERE post_id = ? AND revision <= ? AND kind = 'snapshot')
+                 ORDER BY revision""", (post_id, revision, post_id, revision))
+    rows = c.fetchall()
+    if not rows or rows[-1][0] != revision:
+        return None
+    text = decode(rows[0][2])
+    for _, _, data in rows[1:]:
+        text = apply_delta(text, json.loads(decode(data)))
+    return split_text(text)
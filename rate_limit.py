@@ -0,0 +1,61 @@
+import threading
+import time
+
+# Token buckets per (user, action), shared by every session in the process.
+# Each action allows a burst of `burst` writes, then refills at `per_second`.
+# Checks are O(1): one dict lookup and a little arithmetic under a lock.
+RATE_LIMITS = {
+    "comment": {"burst": 5, "per_second": 1 / 10},
+    "like": {"burst": 20, "per_second": 1},
+    "post": {"burst": 3, "per_second": 1 / 60},
+}
+# Buckets that have refilled completely carry no state worth keeping. Once
+# the table grows past PRUNE_ABOVE entries they are swept out, and the next
+# sweep waits until the table has doubled again, so the scans cost O(1)
+# amortized per check even when most buckets are still refilling.
+PRUNE_ABOVE = 10_000
+
+_lock = threading.Lock()
+# (user_id, action) -> (tokens, updated, times throttled). The per-user
+# throttle count lives in the bucket so it is swept out with it.
+_buckets = {}
+_prune_at = PRUNE_ABOVE
+_stats = {action: {"allowed": 0, "throttled": 0} for action in RATE_LIMITS}
+
+def _prune(now):
+    global _prune_at
+    for key, (tokens, updated, _) in list(_buckets.items()):
+        limit = RATE_LIMITS[key[1]]
+        if tokens + (now - updated) * limit["per_second"] >= limit["burst"]:
+            del _buckets[key]
+    _prune_at = max(PRUNE_ABOVE, 2 * len(_buckets))
+
+# Take one token for this user and action. Returns (allowed, retry_after),
+# where retry_after is the number of seconds until a token is available.
+def allow(user_id, action):
+    limit = RATE_LIMITS[action]
+    now = time.monotonic()
+    key = (user_id, action)
+    with _lock:
+        tokens, updated, throttled = _buckets.get(key, (limit["burst"], now, 0))
+        tokens = min(limit["burst"], tokens + (now - updated) * limit["per_second"])
+        if tokens >= 1:
+            _buckets[key] = (tokens - 1, now, throttled)
+            _stats[action]["allowed"] += 1
+            if len(_buckets) > _prune_at:
+                _prune(now)
+            return True, 0.0
+        _buckets[key] = (tokens, now, throttled + 1)
+        _stats[action]["throttled"] += 1
+        return False, (1 - tokens) / limit["per_second"]
+
+# Process-wide counters: {action: {"allowed": n, "throttled": n}}
+def throttle_stats():
+    with _lock:
+        return {action: dict(counts) for action, counts in _stats.items()}
+
+# How often one user has been throttled, per action, since each of their
+# buckets was last full (a full bucket is forgotten, count and all)
+def user_throttle_counts(user_id):
+    with _lock:
+        return {action: _buckets.get((user_id, action), (0, 0, 0))[2] for action in RATE_LIMITS}
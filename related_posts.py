@@ -0,0 +1,274 @@
+import argparse
+import os
+import re
+import threading
+import zlib
+
+import numpy as np
+
+from data_access import get_feed_page, get_post_by_id
+
+RELATED_DIR = os.path.join('database', 'related')
+# Hashed term dimensions. Each term also gets a +1/-1 sign from another bit
+# of its hash, so terms that collide in a bucket cancel out on average rather
+# than adding up, and unrelated posts score near 0 instead of sharing a
+# collision floor. 100k posts take 100k * 1024 * 4 bytes = 400 MB of float32
+# vectors on disk, paged in by the OS as needed.
+DIM = 1024
+TOP_K = 5
+# On benchmarks/related_noise.py's 10-topic corpus at 1024 dims, 99% of
+# cross-topic pairs score under 0.14 and same-topic pairs average 0.21; this
+# lets through under 0.5% of unrelated pairs
+MIN_SCORE = 0.15
+TITLE_WEIGHT = 2
+INITIAL_CAPACITY = 1024
+# Rows per batched product; each batch materializes BLOCK_ROWS x capacity
+# float32 scores
+BLOCK_ROWS = 256
+
+STOPWORDS = frozenset("""a an and are as at be but by can do for from has have i if in
+into is it its just my not of on or our so that the their them then there these they
+this to was we were what when which who will with you your""".split())
+
+# Layout under RELATED_DIR, one row per post id (row 0 is never used, so
+# neighbor id 0 means "empty slot"):
+#   vectors.f32    capacity x DIM     L2-normalized TF-IDF vectors
+#   neighbors.i32  capacity x TOP_K   neighbor post ids, best first
+#   scores.f32     capacity x TOP_K   cosine similarity of each neighbor
+#   df.npy         DIM + 1            document frequency per hashed term;
+#                                     the last slot is the document count
+#
+# Neighbor lists are precomputed, so a lookup is a single row read. IDF
+# weights are taken as of the time a post is indexed and drift slowly as the
+# corpus grows; run "python related_posts.py --rebuild" now and then to
+# re-weight everything.
+
+# _lock serializes writers. Readers take no lock: _open never changes a
+# mapping in place, it swaps _index for a new dict, so a reader holding the
+# old one keeps a consistent set of arrays. A neighbor row read while a
+# writer patches it may mix old and new entries for that one lookup.
+_lock = threading.RLock()
+_index = {}
+
+def tokenize(text):
+    return [token for token in re.findall(r"[a-z0-9']+", text.lower())
+            if len(token) > 1 and token not in STOPWORDS]
+
+# Signed term counts per hashed bucket: the low bits of the hash pick the
+# bucket and the top bit the sign
+def term_counts(title, content):
+    buckets, weights = [], []
+    for weight, text in ((TITLE_WEIGHT, title), (1, content)):
+        for token in tokenize(text):
+            h = zlib.crc32(token.encode())
+            buckets.append(h % DIM)
+            weights.append(weight if h >> 31 else -weight)
+    return np.bincount(np.array(buckets, dtype=np.int64), weights=weights,
+                       minlength=DIM).astype(np.float32)
+
+def tfidf(counts, df):
+    n_docs = df[DIM]
+    idf = np.log((1 + n_docs) / (1 + df[:DIM])) + 1
+    vectors = np.zeros_like(counts)
+    present = counts != 0
+    vectors[present] = np.sign(counts[present]) * (1 + np.log(np.abs(counts[present])))
+    vectors *= idf.astype(np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    np.divide(vectors, norms, out=vectors, where=norms > 0)
+    return vectors
+
+def _path(name):
+    return os.path.join(RELATED_DIR, name)
+
+def _map(name, dtype, width, capacity):
+    path = _path(name)
+    size = capacity * width * np.dtype(dtype).itemsize
+    with open(path, 'ab') as f:
+        if f.tell() < size:
+            f.truncate(size)
+    return np.memmap(path, dtype=dtype, mode='r+', shape=(capacity, width))
+
+def _capacity_on_disk():
+    try:
+        return os.path.getsize(_path('vectors.f32')) // (DIM * 4)
+    except FileNotFoundError:
+        return 0
+
+# Map the index files, growing them to hold at least min_capacity rows.
+# Another process (the rebuild job) may have grown the files, so the mapped
+# size is checked against the file size each time. Call with _lock held.
+def _open(min_capacity=0):
+    global _index
+    index = _index
+    capacity = max(_capacity_on_disk(), index.get('capacity', 0))
+    if min_capacity > capacity:
+        capacity = max(min_capacity, capacity * 2, INITIAL_CAPACITY)
+    if index.get('capacity') != capacity:
+        os.makedirs(RELATED_DIR, exist_ok=True)
+        capacity = max(capacity, INITIAL_CAPACITY)
+        index = {
+            'vectors': _map('vectors.f32', np.float32, DIM, capacity),
+            'neighbors': _map('neighbors.i32', np.int32, TOP_K, capacity),
+            'scores': _map('scores.f32', np.float32, TOP_K, capacity),
+            'capacity': capacity,
+        }
+        _index = index
+    return index
+
+def _load_df():
+    try:
+        return np.load(_path('df.npy'))
+    except FileNotFoundError:
+        return np.zeros(DIM + 1, dtype=np.float64)
+
+def _save_df(df):
+    tmp_path = _path('df.tmp.npy')
+    np.save(tmp_path, df)
+    os.replace(tmp_path, _path('df.npy'))
+
+def _flush(index):
+    for name in ('vectors', 'neighbors', 'scores'):
+        index[name].flush()
+
+# Best TOP_K neighbors of each score row, skipping the post itself and
+# anything under MIN_SCORE
+def _top_k(scores, own_ids):
+    scores[np.arange(len(own_ids)), own_ids] = -np.inf
+    best = np.argpartition(-scores, TOP_K - 1, axis=1)[:, :TOP_K]
+    best_scores = np.take_along_axis(scores, best, axis=1)
+    order = np.argsort(-best_scores, axis=1)
+    best = np.take_along_axis(best, order, axis=1).astype(np.int32)
+    best_scores = np.take_along_axis(best_scores, order, axis=1).astype(np.float32)
+    weak = best_scores < MIN_SCORE
+    best[weak] = 0
+    best_scores[weak] = 0
+    return best, best_scores
+
+# Recompute neighbor lists for the given rows, BLOCK_ROWS at a time, each
+# block as one matrix product against every stored vector
+def _recompute_rows(index, rows):
+    vectors = index['vectors']
+    for start in range(0, len(rows), BLOCK_ROWS):
+        block = rows[start:start + BLOCK_ROWS]
+        scores = vectors[block] @ vectors.T
+        index['neighbors'][block], index['scores'][block] = _top_k(scores, block)
+
+# Index or re-index one post and patch every neighbor list it affects
+def post_changed(post_id):
+    post = get_post_by_id(post_id)
+    if post is None or post.archived:
+        post_removed(post_id)
+        return
+    with _lock:
+        index = _open(post_id + 1)
+        vectors, neighbors, scores = index['vectors'], index['neighbors'], index['scores']
+
+        df = _load_df()
+        old_terms = vectors[post_id] != 0
+        counts = term_counts(post.title, post.content)
+        new_terms = counts != 0
+        df[:DIM] += new_terms.astype(np.float64) - old_terms
+        if not old_terms.any():
+            df[DIM] += 1
+        vectors[post_id] = tfidf(counts, df)
+
+        similarity = vectors @ vectors[post_id]
+        # Lists that already hold this post carry a stale score: recompute
+        stale = np.nonzero((neighbors == post_id).any(axis=1))[0]
+        stale = stale[stale != post_id]
+        # Lists this post now beats the weakest entry of: insert in place
+        gains = np.nonzero((similarity >= MIN_SCORE) & (similarity > scores[:, -1]))[0]
+        gains = np.setdiff1d(gains, np.append(stale, post_id))
+        if len(gains):
+            neighbors[gains, -1] = post_id
+            scores[gains, -1] = similarity[gains]
+            order = np.argsort(-scores[gains], axis=1)
+            neighbors[gains] = np.take_along_axis(neighbors[gains], order, axis=1)
+            scores[gains] = np.take_along_axis(scores[gains], order, axis=1)
+        if len(stale):
+            _recompute_rows(index, stale)
+
+        best, best_scores = _top_k(similarity[np.newaxis, :].copy(), np.array([post_id]))
+        neighbors[post_id], scores[post_id] = best[0], best_scores[0]
+
+        _flush(index)
+        _save_df(df)
+
+def post_removed(post_id):
+    posts_removed([post_id])
+
+# Drop posts from the index (deleted, or moved to the archive) and repair
+# every neighbor list that pointed at any of them in one pass
+def posts_removed(post_ids):
+    with _lock:
+        index = _open()
+        rows = np.array([i for i in post_ids if i < index['capacity']], dtype=np.int64)
+        if not len(rows):
+            return
+        vectors, neighbors = index['vectors'], index['neighbors']
+        old_terms = vectors[rows] != 0
+        if old_terms.any():
+            df = _load_df()
+            df[:DIM] -= old_terms.sum(axis=0)
+            df[DIM] -= old_terms.any(axis=1).sum()
+            _save_df(df)
+        vectors[rows] = 0
+        neighbors[rows] = 0
+        index['scores'][rows] = 0
+        stale = np.nonzero(np.isin(neighbors, rows).any(axis=1))[0]
+        if len(stale):
+            _recompute_rows(index, stale)
+        _flush(index)
+
+# Ids of the most similar posts, best first. Reads one precomputed row
+# without locking; only the first lookup in a process, or one for a post past
+# the mapped rows, waits for _lock to (re)map the files.
+def related_post_ids(post_id, k=TOP_K):
+    index = _index
+    if post_id >= index.get('capacity', 0):
+        with _lock:
+            index = _open()
+        if post_id >= index['capacity']:
+            return []
+    return [int(i) for i in index['neighbors'][post_id, :k] if i]
+
+def rebuild():
+    with _lock:
+        posts = []
+        before = None
+        while True:
+            page = get_feed_page(before, 500)
+            if not page:
+                break
+            posts.extend((post.id, post.title, post.content) for post in page)
+            before = page[-1].id
+        index = _open(max((post[0] for post in posts), default=0) + 1)
+        vectors = index['vectors']
+        vectors[:] = 0
+        index['neighbors'][:] = 0
+        index['scores'][:] = 0
+
+        df = np.zeros(DIM + 1, dtype=np.float64)
+        for post_id, title, content in posts:
+            vectors[post_id] = term_counts(title, content)
+            df[:DIM] += vectors[post_id] != 0
+        df[DIM] = len(posts)
+        rows = np.array(sorted(post[0] for post in posts), dtype=np.int64)
+        for start in range(0, len(rows), BLOCK_ROWS):
+            block = rows[start:start + BLOCK_ROWS]
+            vectors[block] = tfidf(vectors[block], df)
+        _recompute_rows(index, rows)
+        _flush(index)
+        _save_df(df)
+        return len(posts)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain the related-posts index")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="re-index every hot post and recompute all neighbor lists")
+    args = parser.parse_args()
+    if args.rebuild:
+        count = rebuild()
+        print(f"Indexed {count} post(s) into {RELATED_DIR}/")
+    else:
+        parser.print_help()
@@ -0,0 +1,212 @@
+import argparse
+import glob
+import html
+import os
+import tempfile
+
+from data_access import count_posts, get_comments, get_post_by_id, get_post_summaries
+
+SITE_DIR = 'site'
+# Public URL that SITE_DIR is published at, ending in '/', e.g.
+# https://blog.example.com/. Left unset the site isn't reachable by readers,
+# and the app shows related posts as plain titles instead of links.
+SITE_URL = os.environ.get('BLOG_SITE_URL')
+INDEX_PAGE_SIZE = 20
+
+# Listing pages are fixed buckets counted from the OLDEST post: page 1 holds
+# posts 1-20, page 2 posts 21-40 and so on. A new post only lands on the last
+# page, so publishing rewrites one or two listing pages instead of shifting
+# every page on the site. index.html always shows the newest posts.
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>{title} - GSV Blogs</title>
+<style>
+body {{ font-family: sans-serif; background-color: #f5f5f5; color: #333333; max-width: 820px; margin: 0 auto; padding: 20px; }}
+h1, h2, h3 {{ color: #166088; }}
+a {{ color: #4a6fa5; }}
+.post-card {{ background-color: white; border-radius: 10px; padding: 20px; margin-bottom: 20px; box-shadow: 0 4px 6px rgba(0,0,0,0.1); }}
+.comment {{ background-color: #f8f9fa; padding: 10px; border-radius: 8px; margin: 5px 0; }}
+.meta {{ font-size: 0.8em; color: #666; }}
+.pager {{ display: flex; justify-content: space-between; margin-top: 20px; }}
+.footer {{ margin-top: 30px; text-align: center; }}
+</style>
+</head>
+<body>
+<p><a href="{root}index.html">GSV BLOGS ✍</a></p>
+{body}
+<div class="footer">&copy; 2025 GSV BLOGS. All rights reserved.</div>
+</body>
+</html>
+"""
+
+def page_count(total=None):
+    if total is None:
+        total = count_posts()
+    return max(1, -(-total // INDEX_PAGE_SIZE))
+
+def page_for_post(post_id):
+    return count_posts(before_id=post_id) // INDEX_PAGE_SIZE + 1
+
+def post_file(post_id):
+    return os.path.join(SITE_DIR, 'posts', f'{post_id}.html')
+
+def post_url(post_id):
+    if not SITE_URL:
+        return None
+    return f"{SITE_URL}posts/{post_id}.html"
+
+def listing_file(page):
+    return os.path.join(SITE_DIR, 'page', f'{page}.html')
+
+# Write via a temp file and rename so a web server or CDN pulling from disk
+# never serves a half-written page. Every write gets its own temp file, since
+# two sessions may re-render the same page at once; the last rename wins.
+def write_file(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(content)
+        # mkstemp creates the file readable by its owner only
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        remove_file(tmp_path)
+        raise
+
+def remove_file(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+def render_summaries(posts, root):
+    items = []
+    for post in posts:
+        items.append(f"""<div class="post-card">
+<h3><a href="{root}posts/{post.id}.html">{html.escape(post.title)}</a></h3>
+<p class="meta">{html.escape(post.author)} | {html.escape(str(post.created_at))}</p>
+</div>""")
+    return "\n".join(items) or "<p>No posts available.</p>"
+
+def render_post(post_id):
+    post = get_post_by_id(post_id)
+    if post is None:
+        remove_file(post_file(post_id))
+        return
+    comments = get_comments(post.id, archived=post.archived)
+    comment_html = "\n".join(
+        f"""<div class="comment" style="margin-left: {comment.depth * 24}px;">
+<strong>{html.escape(comment.username)}:</strong> {html.escape(comment.content)}
+<div class="meta">{html.escape(str(comment.created_at))}</div>
+</div>""" for comment in comments)
+    body = f"""<div class="post-card">
+<h1>{html.escape(post.title)}</h1>
+<p><strong>Author:</strong> {html.escape(post.author)} | <strong>Date:</strong> {html.escape(str(post.created_at))}</p>
+<p>{html.escape(post.content)}</p>
+</div>
+<h2>💬 Comments</h2>
+{comment_html or "<p>No comments yet.</p>"}"""
+    write_file(post_file(post.id), PAGE_TEMPLATE.format(title=html.escape(post.title), root="../", body=body))
+
+def render_listing(page, pages):
+    posts = get_post_summaries(INDEX_PAGE_SIZE, offset=(page - 1) * INDEX_PAGE_SIZE)
+    posts.reverse()
+    older = f'<a href="{page - 1}.html">&larr; Older</a>' if page > 1 else '<span></span>'
+    newer = f'<a href="{page + 1}.html">Newer &rarr;</a>' if page < pages else '<span></span>'
+    body = f"""<h1>Posts, page {page} of {pages}</h1>
+{render_summaries(posts, "../")}
+<div class="pager">{older}{newer}</div>"""
+    write_file(listing_file(page), PAGE_TEMPLATE.format(title=f"Page {page}", root="../", body=body))
+
+def render_index(pages):
+    posts = get_post_summaries(INDEX_PAGE_SIZE, newest_first=True)
+    body = f"""<h1>Welcome to GSV BLOGS! ✍</h1>
+{render_summaries(posts, "")}
+<div class="pager"><a href="page/{pages}.html">&larr; All posts</a><span></span></div>"""
+    write_file(os.path.join(SITE_DIR, 'index.html'), PAGE_TEMPLATE.format(title="Home", root="", body=body))
+
+# Remove listing pages past the end after posts were deleted or archived
+def prune_listings(pages):
+    for path in glob.glob(os.path.join(SITE_DIR, 'page', '*.html')):
+        name = os.path.splitext(os.path.basename(path))[0]
+        if name.isdigit() and int(name) > pages:
+            remove_file(path)
+
+# Remove the pages of posts that are no longer hot (deleted, or moved to
+# archive.db), keeping those in post_ids
+def prune_post_pages(post_ids):
+    for path in glob.glob(os.path.join(SITE_DIR, 'posts', '*.html')):
+        name = os.path.splitext(os.path.basename(path))[0]
+        if name.isdigit() and int(name) not in post_ids:
+            remove_file(path)
+
+# Incremental rebuilds, called after the matching write has been committed
+
+def post_added(post_id):
+    pages = page_count()
+    render_post(post_id)
+    # The new post's page, plus the one before it in case this post opened
+    # a new page and the old last page needs its "Newer" link
+    for page in range(max(1, page_for_post(post_id) - 1), pages + 1):
+        render_listing(page, pages)
+    render_index(pages)
+
+def post_updated(post_id):
+    pages = page_count()
+    render_post(post_id)
+    render_listing(page_for_post(post_id), pages)
+    render_index(pages)
+
+def post_deleted(post_id):
+    pages = page_count()
+    remove_file(post_file(post_id))
+    # Every post after the deleted one moves back a slot
+    for page in range(page_for_post(post_id), pages + 1):
+        render_listing(page, pages)
+    prune_listings(pages)
+    render_index(pages)
+
+def comment_added(post_id):
+    render_post(post_id)
+
+# Archived posts only stay readable in the app (through search), so their
+# pages go. They were the oldest posts, and listing buckets count from the
+# oldest hot post, so every listing page shifts.
+def posts_archived(post_ids):
+    pages = page_count()
+    for post_id in post_ids:
+        remove_file(post_file(post_id))
+    for page in range(1, pages + 1):
+        render_listing(page, pages)
+    prune_listings(pages)
+    render_index(pages)
+
+def build_site():
+    pages = page_count()
+    rendered = set()
+    while True:
+        posts = get_post_summaries(500, offset=len(rendered))
+        if not posts:
+            break
+        for post in posts:
+            render_post(post.id)
+            rendered.add(post.id)
+    prune_post_pages(rendered)
+    for page in range(1, pages + 1):
+        render_listing(page, pages)
+    prune_listings(pages)
+    render_index(pages)
+    return len(rendered)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render the blog to static HTML for anonymous readers")
+    parser.add_argument("--output", default=SITE_DIR, help=f"output directory (default {SITE_DIR})")
+    args = parser.parse_args()
+    SITE_DIR = args.output
+    count = build_site()
+    print(f"Rendered {count} post(s) into {SITE_DIR}/")
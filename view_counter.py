@@ -0,0 +1,104 @@
+import atexit
+import sqlite3
+import threading
+
+import data_access
+
+# Post views are counted in memory and written in batches, so readers never
+# queue behind the SQLite write lock just to bump a counter. A background
+# thread flushes every FLUSH_INTERVAL_SECONDS, or sooner once
+# FLUSH_EVERY_EVENTS views are waiting; a viewer only ever wakes it. At most
+# MAX_PENDING_EVENTS views are held in memory, counting a batch that is
+# being written or waiting for a retry. Views arriving while the buffer is
+# full (the flusher is stuck behind a long write, say) are dropped and
+# counted in dropped_views(), so a crash loses at most MAX_PENDING_EVENTS
+# views and a stuck database costs views rather than page loads.
+FLUSH_INTERVAL_SECONDS = 5
+FLUSH_EVERY_EVENTS = 100
+MAX_PENDING_EVENTS = 4 * FLUSH_EVERY_EVENTS
+WRITE_TIMEOUT_SECONDS = 5
+
+_lock = threading.Lock()
+_flush_lock = threading.Lock()
+_wake = threading.Event()
+_pending = {}
+_in_flight = {}
+_pending_events = 0
+_in_flight_events = 0
+_dropped = 0
+_flusher = None
+
+def _start_flusher():
+    global _flusher
+    if _flusher is None or not _flusher.is_alive():
+        _flusher = threading.Thread(target=_run_flusher, name="view-counter-flush", daemon=True)
+        _flusher.start()
+
+def _run_flusher():
+    while True:
+        _wake.wait(FLUSH_INTERVAL_SECONDS)
+        _wake.clear()
+        flush()
+
+def record_view(post_id):
+    global _pending_events, _dropped
+    with _lock:
+        if _pending_events + _in_flight_events >= MAX_PENDING_EVENTS:
+            _dropped += 1
+            _wake.set()
+            return False
+        _pending[post_id] = _pending.get(post_id, 0) + 1
+        _pending_events += 1
+        events = _pending_events
+        _start_flusher()
+    if events >= FLUSH_EVERY_EVENTS:
+        _wake.set()
+    return True
+
+# Write every buffered view in one transaction. On failure the batch goes
+# back into the buffer and is retried on the next flush. The commit and the
+# clearing of _in_flight happen under _lock, so view_counts never sees a
+# batch both in the table and in memory.
+def flush():
+    global _pending, _in_flight, _pending_events, _in_flight_events
+    with _flush_lock:
+        with _lock:
+            batch, _pending = _pending, {}
+            _in_flight, _in_flight_events, _pending_events = batch, _pending_events, 0
+        if not batch:
+            return 0
+        try:
+            conn = sqlite3.connect(data_access.DB_PATH, timeout=WRITE_TIMEOUT_SECONDS)
+            try:
+                c = conn.cursor()
+                c.executemany("UPDATE posts SET views = views + ? WHERE id = ?",
+                              [(count, post_id) for post_id, count in batch.items()])
+                with _lock:
+                    conn.commit()
+                    _in_flight, _in_flight_events = {}, 0
+            finally:
+                conn.close()
+            return sum(batch.values())
+        except sqlite3.Error:
+            with _lock:
+                for post_id, count in batch.items():
+                    _pending[post_id] = _pending.get(post_id, 0) + count
+                _pending_events += _in_flight_events
+                _in_flight, _in_flight_events = {}, 0
+            return 0
+
+# Views that arrived while the buffer was full and were not counted
+def dropped_views():
+    with _lock:
+        return _dropped
+
+# Stored views plus any still waiting in the buffer, for a batch of posts
+# with one query. The stored counts are read under _lock so a flush cannot
+# commit in between.
+def view_counts(post_ids):
+    with _lock:
+        stored = data_access.get_view_counts(post_ids)
+        return {post_id: stored.get(post_id, 0) + _pending.get(post_id, 0) + _in_flight.get(post_id, 0)
+                for post_id in post_ids}
+
+atexit.register(flush)